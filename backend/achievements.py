@@ -0,0 +1,136 @@
+"""Win streaks and achievement badges.
+
+Each user has one UserAchievements row that is updated as games are saved,
+so reading streaks and badges never scans game history. ``apply_game`` is
+the only place the rules live; after changing them, run
+rebuild_achievements.py to recompute every row from game_stats.
+
+Badges are stored as a bitmask indexed by position in ACHIEVEMENTS, so new
+achievements must be appended, never inserted or reordered.
+"""
+from collections import namedtuple
+
+from sqlalchemy.exc import IntegrityError
+
+from models import GameStats, UserAchievements, PRESET_DIFFICULTIES
+
+_PRESET_IDS = {preset.name: preset.id for preset in PRESET_DIFFICULTIES}
+
+
+class Achievement(namedtuple('Achievement', ['key', 'name', 'description', 'check'])):
+    # ``check(state, game)`` runs after ``state`` has been updated for ``game``
+    __slots__ = ()
+
+    def to_dict(self):
+        return {'key': self.key, 'name': self.name, 'description': self.description}
+
+
+ACHIEVEMENTS = [
+    Achievement('first_win', 'First Win', 'Win a game',
+                lambda state, game: state.wins >= 1),
+    Achievement('streak_5', 'On a Roll', 'Win 5 games in a row',
+                lambda state, game: state.current_streak >= 5),
+    Achievement('streak_10', 'Unstoppable', 'Win 10 games in a row',
+                lambda state, game: state.current_streak >= 10),
+    Achievement('games_100', 'Veteran', 'Play 100 games',
+                lambda state, game: state.games_played >= 100),
+    Achievement('wins_100', 'Centurion', 'Win 100 games',
+                lambda state, game: state.wins >= 100),
+    Achievement('hard_win', 'Expert', 'Win a game on HARD',
+                lambda state, game: game.is_win and game.difficulty_id == _PRESET_IDS['HARD']),
+    Achievement('easy_speedrun', 'Speed Runner', 'Win on EASY in 10 seconds or less',
+                lambda state, game: game.is_win and game.difficulty_id == _PRESET_IDS['EASY'] and game.time_taken <= 10),
+]
+
+
+def new_state(user_id):
+    return UserAchievements(user_id=int(user_id), games_played=0, wins=0,
+                            current_streak=0, longest_streak=0, badges=0)
+
+
+def apply_game(state, game):
+    """Update ``state`` for the user's next game, in constant time."""
+    state.games_played += 1
+    if game.is_win:
+        state.wins += 1
+        state.current_streak += 1
+        state.longest_streak = max(state.longest_streak, state.current_streak)
+    else:
+        state.current_streak = 0
+
+    for bit, achievement in enumerate(ACHIEVEMENTS):
+        if not state.badges >> bit & 1 and achievement.check(state, game):
+            state.badges |= 1 << bit
+
+
+def earned(state):
+    """Achievements unlocked in ``state``, in definition order."""
+    if state is None:
+        return []
+    return [achievement for bit, achievement in enumerate(ACHIEVEMENTS) if state.badges >> bit & 1]
+
+
+def _state_for_update(session, user_id):
+    # Only lock a row known to exist: on InnoDB, SELECT ... FOR UPDATE on a
+    # missing key takes a gap lock, and two first games of a user holding
+    # gap locks deadlock on each other's insert. Two first games can still
+    # race to create the row; the loser's insert fails inside the savepoint
+    # and it locks the winner's row instead.
+    if session.get(UserAchievements, user_id) is None:
+        session.flush()
+        try:
+            with session.begin_nested():
+                session.add(new_state(user_id))
+        except IntegrityError:
+            pass
+    return session.get(UserAchievements, user_id, with_for_update=True, populate_existing=True)
+
+
+def record_games(session, games):
+    """Apply newly added games, in order, to their users' state rows.
+
+    ``session`` must be the session the games are being saved with, so the
+    games and the updated state are committed together.
+    """
+    states = {}
+    for game in games:
+        user_id = int(game.user_id)
+        state = states.get(user_id)
+        if state is None:
+            state = _state_for_update(session, user_id)
+            states[user_id] = state
+        apply_game(state, game)
+
+
+def rebuild(read_session, write_session, batch_size=1000):
+    """Recompute every state row from game history in one ordered pass.
+
+    Games are streamed through ``read_session`` ordered by user and time,
+    and the new rows replace the old ones in a single ``write_session``
+    transaction. Returns the number of users written.
+    """
+    write_session.query(UserAchievements).delete()
+
+    games = read_session.query(
+        GameStats.user_id, GameStats.is_win, GameStats.difficulty_id, GameStats.time_taken
+    ).order_by(GameStats.user_id, GameStats.played_at, GameStats.id).execution_options(yield_per=batch_size)
+
+    users = 0
+    batch = []
+    state = None
+    for game in games:
+        if state is None or state.user_id != game.user_id:
+            state = new_state(game.user_id)
+            batch.append(state)
+            users += 1
+            if len(batch) > batch_size:
+                # Everything but the state still being built is complete
+                write_session.add_all(batch[:-1])
+                write_session.flush()
+                write_session.expunge_all()
+                batch = batch[-1:]
+        apply_game(state, game)
+
+    write_session.add_all(batch)
+    write_session.commit()
+    return users
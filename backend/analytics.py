@@ -0,0 +1,226 @@
+"""Site-wide analytics computed in the background.
+
+A scheduler thread, started with the server (see wsgi.py), refreshes an
+in-memory snapshot every ANALYTICS_REFRESH_SECONDS. Each refresh only
+covers games played since the previous refresh (the watermark), across
+every shard, using the index on played_at. Rows are grouped in SQL by
+hour, difficulty and result, plus one row per active user and hour, and
+folded into running totals, hourly buckets and per-hour sets of active
+users. Requests are served from the latest snapshot and never query
+game_stats themselves.
+
+Rows are only read once they are ANALYTICS_SETTLE_SECONDS old, so games
+still queued by write-behind or in uncommitted transactions are not
+skipped by the watermark. A row committed later than that is missed.
+
+Every worker process keeps its own snapshot. The thread computes the
+initial one as soon as it starts: one aggregate query for older history
+and the grouped queries over the last ANALYTICS_RETENTION_HOURS. Until
+it is ready ``snapshot`` returns None.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, literal_column
+
+from models import db, GameStats, difficulties
+from sharding import shards
+
+
+# Strftime pattern for the start of a row's hour, as SQLite and MySQL format it
+_HOUR_FORMAT = '%Y-%m-%d %H:00:00'
+
+
+def _hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _played_hour(session):
+    # played_at truncated to the hour, in the session's SQL dialect
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        hour = func.date_trunc('hour', GameStats.played_at)
+    elif dialect == 'mysql':
+        hour = func.date_format(GameStats.played_at, _HOUR_FORMAT)
+    else:
+        hour = func.strftime(_HOUR_FORMAT, GameStats.played_at)
+    return hour.label('played_hour')
+
+
+def _as_hour(value):
+    # SQLite and MySQL return the formatted string, PostgreSQL a datetime
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S') if isinstance(value, str) else value
+
+
+def _rate(games, wins):
+    return round(wins / games * 100, 2) if games else 0
+
+
+class _State:
+    # Per-app analytics state; ``lock`` guards the counters and the snapshot
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refreshing = threading.Lock()  # one refresh at a time
+        self.watermark = None
+        self.totals = defaultdict(lambda: [0, 0])  # difficulty_id -> [games, wins]
+        self.hourly = defaultdict(lambda: [0, 0])  # (hour, difficulty_id) -> [games, wins]
+        self.active = defaultdict(set)  # hour -> user ids
+        self.snapshot = None
+        self.refreshed_at = None  # time.monotonic() of the snapshot
+        self.thread = None
+        self.stopping = threading.Event()
+
+
+class AnalyticsRefresher:
+    """Keep a precomputed analytics snapshot up to date in a background thread."""
+
+    def init_app(self, app):
+        app.config.setdefault('ANALYTICS_REFRESH_SECONDS', 60)
+        app.config.setdefault('ANALYTICS_SETTLE_SECONDS', 10)
+        app.config.setdefault('ANALYTICS_RETENTION_HOURS', 168)
+        if app.config['ANALYTICS_SETTLE_SECONDS'] * 1000 <= app.config.get('WRITE_BEHIND_FLUSH_MS', 0):
+            raise ValueError('ANALYTICS_SETTLE_SECONDS must be longer than WRITE_BEHIND_FLUSH_MS')
+        app.extensions['analytics'] = _State()
+
+    @property
+    def _state(self):
+        return current_app.extensions['analytics']
+
+    def snapshot(self):
+        """The latest snapshot with its age, or None before the first refresh."""
+        state = self._state
+        with state.lock:
+            if state.snapshot is None:
+                return None
+            return {**state.snapshot, 'age_seconds': round(time.monotonic() - state.refreshed_at, 3)}
+
+    def start(self, app):
+        """Start the refresh thread for ``app``; it computes the first snapshot right away."""
+        state = app.extensions['analytics']
+        with state.lock:
+            if state.thread is not None:
+                return
+            state.thread = threading.Thread(target=self._run, args=(app,), name='analytics-refresh', daemon=True)
+            state.thread.start()
+
+    def stop(self):
+        state = self._state
+        state.stopping.set()
+        if state.thread is not None:
+            state.thread.join()
+            state.thread = None
+
+    def _run(self, app):
+        state = app.extensions['analytics']
+        interval = 0
+        while not state.stopping.wait(interval):
+            interval = app.config['ANALYTICS_REFRESH_SECONDS']
+            with app.app_context():
+                try:
+                    self.refresh()
+                except Exception:
+                    app.logger.exception('Analytics refresh failed')
+                finally:
+                    db.session.remove()
+
+    def refresh(self):
+        """Fold games played since the last refresh into the snapshot."""
+        config = current_app.config
+        state = self._state
+        with state.refreshing:
+            now = datetime.utcnow()
+            cutoff = now - timedelta(seconds=config['ANALYTICS_SETTLE_SECONDS'])
+            retention = timedelta(hours=config['ANALYTICS_RETENTION_HOURS'])
+
+            since = state.watermark
+            if since is None:
+                # First run: aggregate older history, group only the retained hours
+                since = _hour(cutoff - retention)
+                older = shards.fan_out(lambda session: session.query(
+                    GameStats.difficulty_id, GameStats.is_win, func.count()
+                ).filter(GameStats.played_at < since).group_by(GameStats.difficulty_id, GameStats.is_win).all())
+            else:
+                older = []
+
+            def window(query):
+                return query.filter(GameStats.played_at >= since, GameStats.played_at < cutoff)
+
+            def hourly(session):
+                hour = _played_hour(session)
+                return window(session.query(hour, GameStats.difficulty_id, GameStats.is_win, func.count())).group_by(
+                    literal_column('played_hour'), GameStats.difficulty_id, GameStats.is_win
+                ).all()
+
+            def active(session):
+                hour = _played_hour(session)
+                return window(session.query(hour, GameStats.user_id)).group_by(
+                    literal_column('played_hour'), GameStats.user_id
+                ).all()
+
+            counts = shards.fan_out(hourly)
+            users = shards.fan_out(active)
+
+            with state.lock:
+                for difficulty_id, is_win, count in (row for result in older for row in result):
+                    totals = state.totals[difficulty_id]
+                    totals[0] += count
+                    totals[1] += count if is_win else 0
+
+                for hour, difficulty_id, is_win, count in (row for result in counts for row in result):
+                    for totals in (state.totals[difficulty_id], state.hourly[(_as_hour(hour), difficulty_id)]):
+                        totals[0] += count
+                        totals[1] += count if is_win else 0
+                for hour, user_id in (row for result in users for row in result):
+                    state.active[_as_hour(hour)].add(user_id)
+
+                oldest = _hour(now - retention)
+                for key in [key for key in state.hourly if key[0] < oldest]:
+                    del state.hourly[key]
+                for hour in [hour for hour in state.active if hour < oldest]:
+                    del state.active[hour]
+
+                state.watermark = cutoff
+                state.snapshot = self._build(now, cutoff)
+                state.refreshed_at = time.monotonic()
+
+    def _build(self, now, cutoff):
+        state = self._state
+
+        def name(difficulty_id):
+            spec = difficulties.by_id(difficulty_id)
+            return spec.name if spec else None
+
+        def active_since(hours):
+            start = _hour(now) - timedelta(hours=hours - 1)
+            users = set()
+            for hour, user_ids in state.active.items():
+                if hour >= start:
+                    users |= user_ids
+            return len(users)
+
+        games = sum(games for games, _ in state.totals.values())
+        wins = sum(wins for _, wins in state.totals.values())
+        return {
+            'generated_at': now.isoformat(),
+            'complete_until': cutoff.isoformat(),
+            'totals': {'games': games, 'wins': wins, 'win_rate': _rate(games, wins)},
+            'by_difficulty': [
+                {'difficulty': name(difficulty_id), 'games': games, 'wins': wins, 'win_rate': _rate(games, wins)}
+                for difficulty_id, (games, wins) in sorted(state.totals.items())
+            ],
+            'hourly': [
+                {'hour': hour.isoformat(), 'difficulty': name(difficulty_id), 'games': games, 'wins': wins}
+                for (hour, difficulty_id), (games, wins) in sorted(state.hourly.items())
+            ],
+            'active_users': {
+                'current_hour': active_since(1),
+                'last_24_hours': active_since(24),
+                'last_7_days': active_since(24 * 7),
+            },
+        }
+
+
+analytics = AnalyticsRefresher()
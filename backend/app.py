@@ -3,9 +3,16 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 
+from cache import stats_cache
+from compress import compress
+from analytics import analytics
 from config import Config
-from models import db
+from games import games
+from models import db, difficulties
 from routes import api
+from sharding import shards
+from replicas import replicas
+from write_behind import write_behind
 
 def create_app(config_class=Config):
     # Initialize Flask app
@@ -23,6 +30,14 @@ def create_app(config_class=Config):
     
     # Initialize extensions
     db.init_app(app)
+    shards.init_app(app)
+    difficulties.init_app(app)
+    replicas.init_app(app)
+    write_behind.init_app(app)
+    analytics.init_app(app)
+    stats_cache.init_app(app)
+    games.init_app(app)
+    compress.init_app(app)
     CORS(app, resources={r"/*": {"origins": ["https://minesweeperwinner.netlify.app", "http://localhost:3000"]}}, supports_credentials=True)
     Bcrypt(app)
 
@@ -35,6 +50,8 @@ def create_app(config_class=Config):
     # Create database tables if they don't exist
     with app.app_context():
         db.create_all()
+        shards.create_all()
+        difficulties.seed()
     
     @app.route('/')
     def index():
@@ -44,4 +61,5 @@ def create_app(config_class=Config):
     
 if __name__ == '__main__':
     app = create_app()
+    analytics.start(app)
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Benchmark response compression on small and large API responses.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_compress --games 20000
+
+A user with ``--games`` game stats is created in an in-memory database.
+Each endpoint is then requested with every encoding, and once with
+compression turned off, which is the baseline for overhead. One JSON line
+is printed per case with the mean time per request and the body size.
+"""
+import argparse
+import json
+import time
+
+from flask_bcrypt import Bcrypt
+
+from app import create_app
+from compress import compress
+from config import TestingConfig
+from models import db, GameStats, User
+
+ENDPOINTS = ['/api/user', '/api/user/game-stats', '/api/user/game-stats/export?format=ndjson']
+
+
+class BenchmarkConfig(TestingConfig):
+    JWT_SECRET_KEY = 'benchmark-secret-key-of-reasonable-length'
+
+
+def _setup(games):
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        password = Bcrypt(app).generate_password_hash('benchmark').decode('utf-8')
+        user = User(username='benchmark', password=password)
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([
+            GameStats(user_id=user.id, difficulty_id=1 + i % 3, time_taken=20 + i % 500, is_win=i % 3 != 0)
+            for i in range(games)
+        ])
+        db.session.commit()
+
+    response = app.test_client().post('/api/login', json={'username': 'benchmark', 'password': 'benchmark'})
+    return app, {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+def _measure(client, path, headers, repeat):
+    size = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        size = len(client.get(path, headers=headers).data)
+    return (time.perf_counter() - started) / repeat * 1000, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark response compression.')
+    parser.add_argument('--games', type=int, default=20000, help='game stats in the history')
+    parser.add_argument('--repeat', type=int, default=20, help='requests per case')
+    args = parser.parse_args(argv)
+
+    app, auth = _setup(args.games)
+    client = app.test_client()
+    cases = [('off', 'gzip')] + [('on', encoding) for encoding in ['identity'] + compress.encodings()]
+
+    with app.app_context():
+        for path in ENDPOINTS:
+            # One untimed request first, so lazy imports and caches are warm
+            client.get(path, headers=auth)
+            for enabled, encoding in cases:
+                app.config['COMPRESS_ENABLED'] = enabled == 'on'
+                ms, size = _measure(client, path, {**auth, 'Accept-Encoding': encoding}, args.repeat)
+                print(json.dumps({
+                    'path': path,
+                    'compression': enabled,
+                    'accept_encoding': encoding,
+                    'ms_per_request': round(ms, 3),
+                    'bytes': size,
+                }), flush=True)
+
+
+if __name__ == '__main__':
+    main()
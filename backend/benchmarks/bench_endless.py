@@ -0,0 +1,92 @@
+"""Benchmark the chunked board on a 1,000,000 x 1,000,000 board.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_endless --cells 5000000 --density 0.05
+
+``flood`` opens one cell in the middle of the board and keeps resuming
+until ``--cells`` cells are open, the way a client would page through a
+huge opening. ``scattered`` opens about a viewport of cells at random
+spots across the board with a small chunk budget, so most clicks generate
+fresh chunks and evict and archive old ones. One JSON line is printed per
+scenario.
+"""
+import argparse
+import json
+import random
+import resource
+import time
+
+from endless import OPEN_LIMIT, ChunkedBoard
+
+SIDE = 1000000
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def flood(seed, density, cells, limit, max_chunks):
+    board = ChunkedBoard(seed, density, rows=SIDE, cols=SIDE, max_chunks=max_chunks)
+    started = time.perf_counter()
+    calls = 1
+    opened = len(board.open(SIDE // 2, SIDE // 2, limit))
+    while opened < cells and board.more:
+        opened += len(board.resume(limit))
+        calls += 1
+    seconds = time.perf_counter() - started
+    return {
+        'scenario': 'flood',
+        'opened': opened,
+        'calls': calls,
+        'seconds': round(seconds, 3),
+        'cells_per_second': round(opened / seconds),
+        'chunks_in_memory': board.materialized,
+        'chunks_archived': board.archived,
+        'max_rss_mb': _max_rss_mb(),
+    }
+
+
+def scattered(seed, density, clicks, limit, max_chunks):
+    board = ChunkedBoard(seed, density, rows=SIDE, cols=SIDE, max_chunks=max_chunks)
+    rng = random.Random(seed)
+    latencies = []
+    opened = 0
+    for _ in range(clicks):
+        x, y = rng.randrange(SIDE), rng.randrange(SIDE)
+        started = time.perf_counter()
+        opened += len(board.open(x, y, limit))
+        latencies.append(time.perf_counter() - started)
+        # A lost game would ignore further clicks
+        board.lost = False
+    latencies.sort()
+    return {
+        'scenario': 'scattered',
+        'clicks': clicks,
+        'opened': opened,
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        'chunks_in_memory': board.materialized,
+        'chunks_archived': board.archived,
+        'max_rss_mb': _max_rss_mb(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the chunked board engine.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--density', type=float, default=0.05, help='mine density; low values give large openings')
+    parser.add_argument('--cells', type=int, default=2000000, help='cells to open in the flood scenario')
+    parser.add_argument('--clicks', type=int, default=2000, help='clicks in the scattered scenario')
+    parser.add_argument('--limit', type=int, default=OPEN_LIMIT, help='cells opened per call when flooding')
+    parser.add_argument('--click-limit', type=int, default=1000, help='cells opened per scattered click')
+    parser.add_argument('--max-chunks', type=int, default=1024, help='chunks kept in memory')
+    args = parser.parse_args(argv)
+
+    print(json.dumps(flood(args.seed, args.density, args.cells, args.limit, args.max_chunks)), flush=True)
+    print(json.dumps(scattered(args.seed, args.density, args.clicks, args.click_limit, min(args.max_chunks, 256))))
+
+
+if __name__ == '__main__':
+    main()
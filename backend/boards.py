@@ -0,0 +1,108 @@
+"""Deterministic boards generated from a seed.
+
+A board is fully described by (seed, rows, cols, mines, first click), so it
+can be shared as a 20-byte descriptor instead of a full matrix. Generation
+only uses SplitMix64 and a partial Fisher-Yates shuffle over the candidate
+cells in index order, both of which are straightforward to port to other
+languages and give the same board byte for byte:
+
+1. Candidates are every cell index except the first click and its
+   neighbours (or only the first click if the board is too dense).
+2. For i in 0..mines-1, swap candidates[i] with candidates[i + below(n - i)]
+   where n is the number of candidates.
+3. The first ``mines`` candidates hold the mines.
+
+``below(n)`` draws SplitMix64 outputs until one is below the largest
+multiple of n that fits in 64 bits and returns it modulo n.
+"""
+import base64
+import binascii
+import hashlib
+import struct
+from collections import namedtuple
+
+from engine import layout_candidates
+
+MASK64 = (1 << 64) - 1
+
+# Seeds are kept below 2**63 so they fit a signed BIGINT column
+MAX_SEED = (1 << 63) - 1
+
+_DESCRIPTOR = struct.Struct('>QHHII')
+
+
+class SplitMix64:
+    """The SplitMix64 generator (Steele, Lea and Flood)."""
+
+    def __init__(self, seed):
+        self.state = seed & MASK64
+
+    def next(self):
+        self.state = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def below(self, n):
+        """Uniform integer in [0, n) without modulo bias."""
+        limit = (1 << 64) - (1 << 64) % n
+        while True:
+            value = self.next()
+            if value < limit:
+                return value % n
+
+
+def generate_mines(seed, rows, cols, mines, first_index):
+    """Sorted mine indices for a seeded board."""
+    candidates = layout_candidates(rows, cols, mines, first_index)
+    rng = SplitMix64(seed)
+    n = len(candidates)
+    for i in range(mines):
+        j = i + rng.below(n - i)
+        candidates[i], candidates[j] = candidates[j], candidates[i]
+    return sorted(candidates[:mines])
+
+
+def seeded_layout(seed, rows, cols, mines):
+    """Layout callback for engine.Board that generates the seeded board."""
+    return lambda first_index: generate_mines(seed, rows, cols, mines, first_index)
+
+
+def mine_bitmap(mine_indices, size):
+    """Mines packed one bit per cell, most significant bit first."""
+    bitmap = bytearray((size + 7) // 8)
+    for index in mine_indices:
+        bitmap[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(bitmap)
+
+
+class BoardDescriptor(namedtuple('BoardDescriptor', ['seed', 'rows', 'cols', 'mines', 'first_index'])):
+    """Compact, shareable description of a seeded board."""
+    __slots__ = ()
+
+    def encode(self):
+        packed = _DESCRIPTOR.pack(self.seed, self.rows, self.cols, self.mines, self.first_index)
+        return base64.urlsafe_b64encode(packed).decode('ascii').rstrip('=')
+
+    @classmethod
+    def decode(cls, token):
+        """Parse a token from ``encode``; raises ValueError if it is malformed."""
+        try:
+            packed = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            descriptor = cls(*_DESCRIPTOR.unpack(packed))
+        except (binascii.Error, struct.error, TypeError) as e:
+            raise ValueError('Invalid board descriptor') from e
+        size = descriptor.rows * descriptor.cols
+        if descriptor.first_index >= size or descriptor.mines >= size:
+            raise ValueError('Invalid board descriptor')
+        return descriptor
+
+    def mine_indices(self):
+        return generate_mines(self.seed, self.rows, self.cols, self.mines, self.first_index)
+
+
+def daily_seed(day, salt=''):
+    """Seed shared by every player for the challenge on ``day`` (a date)."""
+    digest = hashlib.sha256(f'daily:{salt}:{day.isoformat()}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') & MAX_SEED
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Small thread-safe LRU cache with an optional time-to-live.
+
+    Entries beyond ``maxsize`` are evicted least recently used first; with
+    ``ttl`` set, entries older than ``ttl`` seconds are treated as missing.
+    With ``weigh`` and ``maxweight`` set, entries are also evicted while
+    the total of ``weigh(value)`` exceeds ``maxweight``; ``maxsize`` may
+    then be None to bound the cache by weight alone.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, weigh=None, maxweight=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.weigh = weigh
+        self.maxweight = maxweight
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        value, _, weight = self._data.pop(key)
+        self.weight -= weight
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, stored_at, _ = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        weight = self.weigh(value) if self.weigh else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, time.monotonic(), weight)
+            self.weight += weight
+            while (self.maxsize is not None and len(self._data) > self.maxsize) or (
+                    self.maxweight is not None and self.weight > self.maxweight and len(self._data) > 1):
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+
+class StatsCache:
+    """Per-app cache for computed stats such as summaries and leaderboards.
+
+    Entries live for STATS_CACHE_SECONDS. A user's summary is dropped as soon
+    as one of their games is saved; leaderboards rely on the short TTL.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('STATS_CACHE_SIZE', 10000)
+        app.config.setdefault('STATS_CACHE_SECONDS', 30)
+        app.extensions['stats_cache'] = LRUCache(app.config['STATS_CACHE_SIZE'],
+                                                 ttl=app.config['STATS_CACHE_SECONDS'])
+
+    @property
+    def _cache(self):
+        return current_app.extensions['stats_cache']
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def invalidate_user(self, user_id):
+        self._cache.pop(('summary', str(user_id)))
+
+
+stats_cache = StatsCache()
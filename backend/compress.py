@@ -0,0 +1,106 @@
+"""Compress API responses for clients that accept it.
+
+The encoding is negotiated from Accept-Encoding: brotli when the client
+prefers or ties it, else gzip. ``brotli`` is in requirements.txt; without
+it only gzip is offered. Buffered responses below COMPRESS_MIN_SIZE are sent as they are
+without touching the body, so small responses cost no compression CPU.
+Streamed responses (exports) have no length up front and are compressed
+chunk by chunk as they are sent.
+
+Responses that already carry a Content-Encoding, such as ``?gzip=1``
+exports, are passed through unchanged.
+"""
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+class _Brotli:
+    # Same interface as a zlib compressor
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+class Compress:
+    """Response compression registered as an after_request hook."""
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+        app.config.setdefault('COMPRESS_MIMETYPES', [
+            'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain',
+        ])
+        app.after_request(self.after_request)
+
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def _compressor(self, encoding):
+        config = current_app.config
+        if encoding == 'br':
+            return _Brotli(config['COMPRESS_BROTLI_QUALITY'])
+        # wbits=31 produces a gzip container instead of a raw zlib stream
+        return zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+
+    def after_request(self, response):
+        config = current_app.config
+        if (not config['COMPRESS_ENABLED']
+                or response.mimetype not in config['COMPRESS_MIMETYPES']
+                or 'Content-Encoding' in response.headers
+                or response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 304)):
+            return response
+
+        # Whether the body is compressed depends on this request header
+        response.vary.add('Accept-Encoding')
+
+        encoding = request.accept_encodings.best_match(self.encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response, self._compressor(encoding))
+            response.headers.pop('Content-Length', None)
+        else:
+            length = response.calculate_content_length()
+            if length is None or length < config['COMPRESS_MIN_SIZE']:
+                return response
+            compressor = self._compressor(encoding)
+            response.set_data(compressor.compress(response.get_data()) + compressor.flush())
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _stream(self, response, compressor):
+        original = response.response
+        chunks = response.iter_encoded()
+
+        def generate():
+            try:
+                for chunk in chunks:
+                    data = compressor.compress(chunk)
+                    if data:
+                        yield data
+                yield compressor.flush()
+            finally:
+                # Closing the wrapper must still close the original body
+                if hasattr(original, 'close'):
+                    original.close()
+
+        return generate()
+
+
+compress = Compress()
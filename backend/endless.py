@@ -0,0 +1,330 @@
+"""Chunked board for endless mode and very large boards.
+
+The map is tiled into CHUNK_SIZE x CHUNK_SIZE chunks addressed by
+(chunk_x, chunk_y). A chunk's mines depend only on (seed, chunk_x, chunk_y)
+so chunks are generated when first touched, in any order:
+
+1. The chunk seed is the first 8 bytes (big endian) of
+   blake2b(pack('>Qqq', seed, chunk_x, chunk_y), digest_size=8).
+2. Mines are the first ``mines`` cells of a partial Fisher-Yates shuffle of
+   the chunk's local indices (y * CHUNK_SIZE + x), drawn with SplitMix64
+   exactly as in boards.py.
+
+As with engine.Board, the first opened cell and its neighbours are kept
+clear, and cells past the edge of a bounded board never hold mines.
+
+Only the most recently used chunks are kept in memory. When a chunk with
+opened or flagged cells is evicted its state is kept zlib compressed and
+its mines and numbers are regenerated when it is touched again.
+
+Flood fills can cover millions of cells, so ``open`` stops after ``limit``
+cells and keeps the unexplored frontier; ``resume`` continues from it.
+"""
+import hashlib
+import struct
+import zlib
+from collections import OrderedDict
+
+from boards import SplitMix64
+from cache import LRUCache
+from engine import COVERED, OPENED, FLAGGED
+
+# Cells outside a bounded board that share a chunk with cells on it
+OUTSIDE = 3
+
+# Reported instead of a number when a mine is opened
+MINE = -1
+
+CHUNK_SHIFT = 6
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+CHUNK_CELLS = CHUNK_SIZE * CHUNK_SIZE
+
+# Cells opened per call before the fill is paused
+OPEN_LIMIT = 100000
+
+_CHUNK_KEY = struct.Struct('>Qqq')
+
+
+def _chunk_tables():
+    # For each local index: neighbours inside the chunk, and neighbours in
+    # adjacent chunks as (chunk dx, chunk dy, local index there)
+    inside, outside = [], []
+    for index in range(CHUNK_CELLS):
+        y, x = divmod(index, CHUNK_SIZE)
+        here, there = [], []
+        for ny in (y - 1, y, y + 1):
+            for nx in (x - 1, x, x + 1):
+                if nx == x and ny == y:
+                    continue
+                if 0 <= nx < CHUNK_SIZE and 0 <= ny < CHUNK_SIZE:
+                    here.append(ny * CHUNK_SIZE + nx)
+                else:
+                    there.append((nx >> CHUNK_SHIFT, ny >> CHUNK_SHIFT, (ny & CHUNK_MASK) * CHUNK_SIZE + (nx & CHUNK_MASK)))
+        inside.append(tuple(here))
+        outside.append(tuple(there))
+    return tuple(inside), tuple(outside)
+
+
+_INSIDE, _OUTSIDE = _chunk_tables()
+
+
+def chunk_seed(seed, chunk_x, chunk_y):
+    digest = hashlib.blake2b(_CHUNK_KEY.pack(seed, chunk_x, chunk_y), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def chunk_mines(seed, chunk_x, chunk_y, mines):
+    """Sorted local indices of the mines generated for a chunk."""
+    rng = SplitMix64(chunk_seed(seed, chunk_x, chunk_y))
+    candidates = list(range(CHUNK_CELLS))
+    for i in range(mines):
+        j = i + rng.below(CHUNK_CELLS - i)
+        candidates[i], candidates[j] = candidates[j], candidates[i]
+    return sorted(candidates[:mines])
+
+
+class _Chunk:
+    __slots__ = ('state', 'counts', 'mines', 'dirty')
+
+    def __init__(self, state, counts, mines):
+        self.state = state
+        self.counts = counts
+        self.mines = mines
+        self.dirty = False
+
+
+class ChunkedBoard:
+    """Board of ``rows`` x ``cols`` cells, or unbounded when they are None.
+
+    Cells are addressed by (x, y), column first. ``density`` is the
+    fraction of cells in each chunk that hold a mine.
+    """
+
+    def __init__(self, seed, density=0.15, rows=None, cols=None, max_chunks=1024):
+        if not 0 <= density < 1:
+            raise ValueError('Density must be at least 0 and below 1')
+        self.seed = seed
+        self.rows = rows
+        self.cols = cols
+        self.mines_per_chunk = round(density * CHUNK_CELLS)
+        self.max_chunks = max_chunks
+        self.start = None
+        self.lost = False
+        self.opened = 0
+        self.flags = 0
+        self._chunks = OrderedDict()
+        self._archive = {}
+        self._pending = {}
+        # Counting a chunk's numbers needs the mines of its eight neighbours
+        self._mines = LRUCache(max_chunks * 4)
+
+    @property
+    def started(self):
+        return self.start is not None
+
+    @property
+    def more(self):
+        """Whether a paused flood fill may still open cells."""
+        return bool(self._pending)
+
+    @property
+    def materialized(self):
+        return len(self._chunks)
+
+    @property
+    def archived(self):
+        return len(self._archive)
+
+    def on_board(self, x, y):
+        return ((self.cols is None or 0 <= x < self.cols) and
+                (self.rows is None or 0 <= y < self.rows))
+
+    def _chunk_on_board(self, chunk_x, chunk_y):
+        # Whether any cell of the chunk is on the board
+        x, y = chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE
+        return ((self.cols is None or (x + CHUNK_MASK >= 0 and x < self.cols)) and
+                (self.rows is None or (y + CHUNK_MASK >= 0 and y < self.rows)))
+
+    def _mines_of(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        mines = self._mines.get(key)
+        if mines is None:
+            mines = self._generate(chunk_x, chunk_y)
+            self._mines.set(key, mines)
+        return mines
+
+    def _generate(self, chunk_x, chunk_y):
+        if not self._chunk_on_board(chunk_x, chunk_y):
+            return frozenset()
+        base_x, base_y = chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE
+        start_x, start_y = self.start
+        mines = []
+        for index in chunk_mines(self.seed, chunk_x, chunk_y, self.mines_per_chunk):
+            x, y = base_x + (index & CHUNK_MASK), base_y + (index >> CHUNK_SHIFT)
+            if self.on_board(x, y) and (abs(x - start_x) > 1 or abs(y - start_y) > 1):
+                mines.append(index)
+        return frozenset(mines)
+
+    def _counts(self, chunk_x, chunk_y):
+        counts = bytearray(CHUNK_CELLS)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                mines = self._mines_of(chunk_x + dx, chunk_y + dy)
+                if not dx and not dy:
+                    for mine in mines:
+                        for other in _INSIDE[mine]:
+                            counts[other] += 1
+                    continue
+                # Only mines on the facing edge or corner touch this chunk
+                for mine in mines:
+                    mx = (mine & CHUNK_MASK) + dx * CHUNK_SIZE
+                    my = (mine >> CHUNK_SHIFT) + dy * CHUNK_SIZE
+                    if -1 <= mx <= CHUNK_SIZE and -1 <= my <= CHUNK_SIZE:
+                        for ny in range(max(my - 1, 0), min(my + 2, CHUNK_SIZE)):
+                            for nx in range(max(mx - 1, 0), min(mx + 2, CHUNK_SIZE)):
+                                counts[ny * CHUNK_SIZE + nx] += 1
+        return counts
+
+    def _blank_state(self, chunk_x, chunk_y):
+        state = bytearray(CHUNK_CELLS)
+        base_x, base_y = chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE
+        if not (self.on_board(base_x, base_y) and self.on_board(base_x + CHUNK_MASK, base_y + CHUNK_MASK)):
+            for index in range(CHUNK_CELLS):
+                if not self.on_board(base_x + (index & CHUNK_MASK), base_y + (index >> CHUNK_SHIFT)):
+                    state[index] = OUTSIDE
+        return state
+
+    def _chunk(self, key):
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+
+        archived = self._archive.get(key)
+        state = bytearray(zlib.decompress(archived)) if archived is not None else self._blank_state(*key)
+        chunk = _Chunk(state, self._counts(*key), self._mines_of(*key))
+        self._chunks[key] = chunk
+
+        if len(self._chunks) > self.max_chunks:
+            old_key, old = self._chunks.popitem(last=False)
+            if old.dirty:
+                self._archive[old_key] = zlib.compress(old.state)
+        return chunk
+
+    def cell(self, x, y):
+        """(state, number) of a cell; the number is None unless it is opened."""
+        if not self.on_board(x, y):
+            raise ValueError('Cell is off the board')
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        index = (y & CHUNK_MASK) * CHUNK_SIZE + (x & CHUNK_MASK)
+        if not self.started:
+            return COVERED, None
+        chunk = self._chunk(key)
+        state = chunk.state[index]
+        if state != OPENED:
+            return state, None
+        return state, MINE if index in chunk.mines else chunk.counts[index]
+
+    def open(self, x, y, limit=OPEN_LIMIT):
+        """Open a cell, flood filling from zeros across chunks.
+
+        Returns the opened cells as (x, y, number) with at most ``limit``
+        entries; if the fill was cut short ``more`` is true and ``resume``
+        carries on. The clicked cell's chunk is filled before any paused
+        fill is continued.
+        """
+        if not self.on_board(x, y):
+            raise ValueError('Cell is off the board')
+        if self.lost:
+            return []
+        if not self.started:
+            self.start = (x, y)
+
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        index = (y & CHUNK_MASK) * CHUNK_SIZE + (x & CHUNK_MASK)
+        chunk = self._chunk(key)
+        if chunk.state[index] != COVERED:
+            return []
+
+        if index in chunk.mines:
+            chunk.state[index] = OPENED
+            chunk.dirty = True
+            self.lost = True
+            self._pending.clear()
+            return [(x, y, MINE)]
+
+        changed = []
+        self._fill(key, [index], limit, changed)
+        self.opened += len(changed)
+        return changed + self.resume(limit - len(changed))
+
+    def resume(self, limit=OPEN_LIMIT):
+        """Continue paused flood fills, opening at most ``limit`` cells."""
+        changed = []
+        while self._pending and len(changed) < limit:
+            key = next(iter(self._pending))
+            seeds = self._pending.pop(key)
+            if self._chunk_on_board(*key):
+                self._fill(key, seeds, limit - len(changed), changed)
+        self.opened += len(changed)
+        return changed
+
+    def _fill(self, key, seeds, budget, changed):
+        chunk = self._chunk(key)
+        state, counts = chunk.state, chunk.counts
+        chunk_x, chunk_y = key
+        base_x, base_y = chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE
+        pending = self._pending
+
+        # Cells are marked when pushed so each is pushed once
+        stack = []
+        for index in seeds:
+            if state[index] == COVERED:
+                state[index] = OPENED
+                stack.append(index)
+        if stack:
+            chunk.dirty = True
+
+        opened = 0
+        while stack and opened < budget:
+            index = stack.pop()
+            opened += 1
+            count = counts[index]
+            changed.append((base_x + (index & CHUNK_MASK), base_y + (index >> CHUNK_SHIFT), count))
+            if count == 0:
+                for other in _INSIDE[index]:
+                    if state[other] == COVERED:
+                        state[other] = OPENED
+                        stack.append(other)
+                for dx, dy, other in _OUTSIDE[index]:
+                    pending.setdefault((chunk_x + dx, chunk_y + dy), []).append(other)
+
+        if stack:
+            # Out of budget; unmark what was queued and keep it for resume
+            for index in stack:
+                state[index] = COVERED
+            pending.setdefault(key, []).extend(stack)
+
+    def toggle_flag(self, x, y):
+        """Flag or unflag a covered cell. Returns the cells that changed.
+
+        Flags can only be placed once the first cell has been opened,
+        since that decides where the mines go.
+        """
+        if not self.on_board(x, y):
+            raise ValueError('Cell is off the board')
+        if self.lost or not self.started:
+            return []
+        chunk = self._chunk((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        index = (y & CHUNK_MASK) * CHUNK_SIZE + (x & CHUNK_MASK)
+        if chunk.state[index] == FLAGGED:
+            chunk.state[index] = COVERED
+            self.flags -= 1
+        elif chunk.state[index] == COVERED:
+            chunk.state[index] = FLAGGED
+            self.flags += 1
+        else:
+            return []
+        chunk.dirty = True
+        return [(x, y)]
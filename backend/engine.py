@@ -0,0 +1,160 @@
+"""Server-side Minesweeper board.
+
+Cells are addressed by flat index (row * cols + col). Like the frontend,
+mines are placed on the first open so that the first cell and its
+neighbours are always safe.
+"""
+
+from functools import lru_cache
+
+COVERED = 0
+OPENED = 1
+FLAGGED = 2
+
+# Boards up to this many cells share a precomputed neighbour table, which
+# costs a few hundred bytes per cell; larger ones compute neighbours as needed
+MAX_TABLE_CELLS = 2500
+
+
+def neighbours(index, rows, cols):
+    row, col = divmod(index, cols)
+    result = []
+    for r in range(max(row - 1, 0), min(row + 2, rows)):
+        for c in range(max(col - 1, 0), min(col + 2, cols)):
+            if r != row or c != col:
+                result.append(r * cols + c)
+    return result
+
+
+@lru_cache(maxsize=8)
+def neighbour_table(rows, cols):
+    return tuple(tuple(neighbours(index, rows, cols)) for index in range(rows * cols))
+
+
+def layout_candidates(rows, cols, mines, first_index):
+    """Cells that may hold a mine: all but the first click and its neighbours, in index order."""
+    excluded = set(neighbours(first_index, rows, cols))
+    excluded.add(first_index)
+    if rows * cols - len(excluded) < mines:
+        # Dense custom boards can only keep the clicked cell itself clear
+        excluded = {first_index}
+    return [index for index in range(rows * cols) if index not in excluded]
+
+
+def random_layout(rng, rows, cols, mines, first_index):
+    """Mine indices drawn with ``rng``, avoiding the first click and its neighbours."""
+    return rng.sample(layout_candidates(rows, cols, mines, first_index), mines)
+
+
+class Board:
+    """Board state that is updated in place by each move.
+
+    ``layout`` is called with the first opened index and returns the mine
+    indices for the game.
+    """
+
+    def __init__(self, rows, cols, mines, layout):
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.size = rows * cols
+        self._layout = layout
+        self.is_mine = None
+        self.counts = None
+        self.state = bytearray(self.size)
+        self.opened = 0
+        self.flags = 0
+        self.lost = False
+        self._table = neighbour_table(rows, cols) if self.size <= MAX_TABLE_CELLS else None
+
+    @property
+    def started(self):
+        return self.is_mine is not None
+
+    @property
+    def won(self):
+        return not self.lost and self.opened == self.size - self.mines
+
+    @property
+    def over(self):
+        return self.lost or self.won
+
+    def neighbours(self, index):
+        if self._table is not None:
+            return self._table[index]
+        return neighbours(index, self.rows, self.cols)
+
+    def place_mines(self, mine_indices):
+        self.is_mine = bytearray(self.size)
+        for index in mine_indices:
+            self.is_mine[index] = 1
+        self.counts = bytearray(self.size)
+        for index in range(self.size):
+            if self.is_mine[index]:
+                for other in self.neighbours(index):
+                    self.counts[other] += 1
+
+    def open(self, index):
+        """Open a cell, flood filling from zeros. Returns the indices that changed."""
+        if self.over or self.state[index] != COVERED:
+            return []
+        if not self.started:
+            self.place_mines(self._layout(index))
+
+        if self.is_mine[index]:
+            self.state[index] = OPENED
+            self.lost = True
+            return [index]
+
+        changed = []
+        stack = [index]
+        self.state[index] = OPENED
+        while stack:
+            current = stack.pop()
+            changed.append(current)
+            if self.counts[current] == 0:
+                for other in self.neighbours(current):
+                    if self.state[other] == COVERED:
+                        self.state[other] = OPENED
+                        stack.append(other)
+        self.opened += len(changed)
+        return changed
+
+    def toggle_flag(self, index):
+        """Flag or unflag a covered cell. Returns the indices that changed."""
+        if self.over or self.state[index] == OPENED:
+            return []
+        if self.state[index] == FLAGGED:
+            self.state[index] = COVERED
+            self.flags -= 1
+        else:
+            self.state[index] = FLAGGED
+            self.flags += 1
+        return [index]
+
+    def three_bv(self):
+        """Minimum clicks needed to clear the board (the 3BV metric).
+
+        Each opening (connected zeros plus their border) counts once and
+        every other safe cell counts once.
+        """
+        marked = bytearray(self.size)
+        clicks = 0
+        for index in range(self.size):
+            if marked[index] or self.is_mine[index] or self.counts[index]:
+                continue
+            clicks += 1
+            marked[index] = 1
+            stack = [index]
+            while stack:
+                current = stack.pop()
+                if self.counts[current]:
+                    continue
+                for other in self.neighbours(current):
+                    if not marked[other]:
+                        marked[other] = 1
+                        stack.append(other)
+        for index in range(self.size):
+            if not marked[index] and not self.is_mine[index]:
+                clicks += 1
+        return clicks
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import zlib
+from itertools import chain
+
+# Columns written by the export, in order (matches GameStats.to_dict)
+EXPORT_FIELDS = ['id', 'user_id', 'difficulty', 'time_taken', 'is_win',
+                 'mines_flagged', 'cells_opened', 'seed', 'played_at']
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched from the database per round trip
+EXPORT_BATCH_SIZE = 1000
+
+# Approximate size of each chunk handed to the WSGI server
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row.to_dict())
+        yield buffer.getvalue()
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row.to_dict(), separators=(',', ':')) + '\n'
+
+
+def _chunked(lines):
+    # Group small lines into larger chunks so we don't flush per row
+    parts = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield b''.join(parts)
+
+
+def _gzipped(chunks):
+    # wbits=31 produces a gzip container instead of a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(queries, fmt, gzip=False):
+    """Yield the rows of one or more GameStats queries as encoded byte chunks.
+
+    Queries are consumed one after another (one per shard for global
+    exports). Rows are pulled with yield_per so only one batch is held in
+    memory at a time, regardless of how many rows the queries match.
+    """
+    rows = chain.from_iterable(query.yield_per(EXPORT_BATCH_SIZE) for query in queries)
+    lines = _csv_lines(rows) if fmt == 'csv' else _ndjson_lines(rows)
+    chunks = _chunked(lines)
+    return _gzipped(chunks) if gzip else chunks
+
+
+def export_filename(prefix, fmt, gzip=False):
+    filename = f'{prefix}.{fmt}'
+    return filename + '.gz' if gzip else filename
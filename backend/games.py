@@ -0,0 +1,186 @@
+"""Games held on the server and played one move at a time.
+
+Each move is applied to the board in place and only the cells it changed
+are sent back, as a flat list of [index, value, index, value, ...] pairs.
+Values use the same encoding as hint boards: 0-8 for an opened number,
+COVERED, FLAGGED, or MINE for a revealed mine.
+
+Every move that changes the board bumps the game's version. Clients send
+the version their board is at; if it doesn't match, a delta was missed
+and they should reload the full state.
+"""
+import secrets
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+import engine
+from boards import MAX_SEED, seeded_layout
+from cache import LRUCache
+from hints import COVERED, FLAGGED
+
+MINE = 9
+
+# Rough size of a game beyond its three per-cell bytearrays
+GAME_OVERHEAD_BYTES = 2048
+
+
+class StaleVersion(Exception):
+    """The client's board is behind the server's."""
+
+    def __init__(self, version):
+        super().__init__(f'Game is at version {version}')
+        self.version = version
+
+
+class Game:
+    """One server-held game; moves are serialised by a per-game lock."""
+
+    def __init__(self, user_id, difficulty, seed):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.difficulty = difficulty
+        self.seed = seed
+        self.board = engine.Board(difficulty.rows, difficulty.cols, difficulty.mines,
+                                  seeded_layout(seed, difficulty.rows, difficulty.cols, difficulty.mines))
+        self.version = 0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        if self.board.lost:
+            return 'lost'
+        return 'won' if self.board.won else 'playing'
+
+    @property
+    def time_taken(self):
+        if self.started_at is None:
+            return 0
+        return int((self.finished_at or time.monotonic()) - self.started_at)
+
+    def value(self, index):
+        board = self.board
+        state = board.state[index]
+        if state == engine.OPENED:
+            return MINE if board.is_mine[index] else board.counts[index]
+        if state == engine.FLAGGED:
+            return FLAGGED
+        # A lost game shows where the remaining mines were
+        return MINE if board.lost and board.is_mine[index] else COVERED
+
+    @property
+    def nbytes(self):
+        # state, is_mine and counts hold one byte per cell each
+        return GAME_OVERHEAD_BYTES + 3 * self.board.size
+
+    def cells(self):
+        return [self.value(index) for index in range(self.board.size)]
+
+    def move(self, action, index, version=None):
+        """Apply a move and return the packed changes.
+
+        Raises StaleVersion if ``version`` is given and isn't the current
+        one, and ValueError for an unknown action or index.
+        """
+        if action not in ('open', 'flag'):
+            raise ValueError('Unknown action')
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < self.board.size:
+            raise ValueError('Invalid cell index')
+
+        with self._lock:
+            if version is not None and version != self.version:
+                raise StaleVersion(self.version)
+
+            board = self.board
+            if action == 'open':
+                if self.started_at is None:
+                    self.started_at = time.monotonic()
+                changed = board.open(index)
+                if board.lost:
+                    changed = changed + [i for i in range(board.size)
+                                         if board.is_mine[i] and board.state[i] == engine.COVERED]
+            else:
+                changed = board.toggle_flag(index)
+
+            if changed:
+                self.version += 1
+                if board.over and self.finished_at is None:
+                    self.finished_at = time.monotonic()
+
+            packed = []
+            for i in changed:
+                packed.append(i)
+                packed.append(self.value(i))
+            return packed
+
+    def to_dict(self, cells=False):
+        data = {
+            'id': self.id,
+            'difficulty': self.difficulty.name,
+            'rows': self.difficulty.rows,
+            'cols': self.difficulty.cols,
+            'mines': self.difficulty.mines,
+            'seed': str(self.seed),
+            'version': self.version,
+            'status': self.status,
+            'flags': self.board.flags,
+            'time_taken': self.time_taken,
+        }
+        if cells:
+            data['cells'] = self.cells()
+        return data
+
+
+class GameStore:
+    """In-process store of active games.
+
+    Games are dropped after GAME_IDLE_SECONDS without a move, or least
+    recently used first once the games together take more than
+    GAME_STORE_MAX_BYTES. Boards are limited to GAME_MAX_CELLS cells. The
+    store is per process, so with several workers a game's requests must
+    reach the worker that created it.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('GAME_STORE_MAX_BYTES', 64 * 1024 * 1024)
+        app.config.setdefault('GAME_MAX_CELLS', 10000)
+        app.config.setdefault('GAME_IDLE_SECONDS', 3600)
+        app.extensions['games'] = LRUCache(
+            maxsize=None,
+            ttl=app.config['GAME_IDLE_SECONDS'],
+            weigh=lambda game: game.nbytes,
+            maxweight=app.config['GAME_STORE_MAX_BYTES']
+        )
+
+    @property
+    def _games(self):
+        return current_app.extensions['games']
+
+    def fits(self, difficulty):
+        """Whether a game on ``difficulty`` may be held in the store."""
+        return difficulty.rows * difficulty.cols <= current_app.config['GAME_MAX_CELLS']
+
+    def create(self, user_id, difficulty, seed=None):
+        if seed is None:
+            seed = secrets.randbelow(MAX_SEED + 1)
+        game = Game(user_id, difficulty, seed)
+        self._games.set(game.id, game)
+        return game
+
+    def get(self, game_id, user_id):
+        """The user's game, or None if it doesn't exist or has expired."""
+        game = self._games.get(game_id)
+        if game is None or game.user_id != user_id:
+            return None
+        return game
+
+    def touch(self, game):
+        # Re-storing restarts the idle timeout
+        self._games.set(game.id, game)
+
+
+games = GameStore()
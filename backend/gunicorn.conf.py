@@ -0,0 +1,6 @@
+# Loaded automatically by gunicorn from the working directory
+
+def worker_exit(server, worker):
+    # Commit any game stats still waiting in the write-behind queue
+    from write_behind import write_behind
+    write_behind.drain()
@@ -0,0 +1,353 @@
+"""Mine probabilities for a partially opened board.
+
+Boards are lists of rows; each cell is 0-8 for an opened cell showing that
+many neighbouring mines, COVERED for an unopened cell or FLAGGED for a
+flagged one. Flags are treated like covered cells because the player may
+have placed them wrongly.
+
+The exact solver splits the covered cells next to numbers (the frontier)
+into independent components, counts each component's solutions by mine
+count with a memoised enumeration, and weights them by the number of ways
+to place the remaining mines among the unconstrained interior cells.
+"""
+import hashlib
+import math
+import time
+from collections import deque, namedtuple
+
+from cache import LRUCache
+
+COVERED = -1
+FLAGGED = -2
+
+MAX_BOARD_SIDE = 1000
+
+# Deeper components fall back to the approximation rather than recursing
+MAX_COMPONENT_SIZE = 500
+
+HINT_CACHE_SIZE = 1024
+# Results are weighed by board size, so a few huge boards can't pin hundreds of MB
+HINT_CACHE_BYTES = 32 * 1024 * 1024
+
+_NEIGHBOURS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+# probabilities mirrors the board, with None for opened cells
+HintResult = namedtuple('HintResult', ['probabilities', 'exact'])
+
+
+
+def _hint_bytes(hint):
+    # Roughly a list slot plus a float object per cell
+    return sum(len(row) for row in hint.probabilities) * 32
+
+
+hint_cache = LRUCache(HINT_CACHE_SIZE, weigh=_hint_bytes, maxweight=HINT_CACHE_BYTES)
+
+
+class InconsistentBoard(ValueError):
+    """No mine layout matches the numbers shown on the board."""
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+def validate_board(board, mines, max_cells=None):
+    """Raise ValueError unless ``board`` and ``mines`` are well formed.
+
+    Boards with more than ``max_cells`` cells are rejected before any cell
+    is looked at.
+    """
+    if not isinstance(board, list) or not board or not all(isinstance(row, list) for row in board):
+        raise ValueError('Board must be a non-empty list of rows')
+    cols = len(board[0])
+    if cols == 0 or any(len(row) != cols for row in board):
+        raise ValueError('Board rows must all have the same length')
+    if len(board) > MAX_BOARD_SIDE or cols > MAX_BOARD_SIDE:
+        raise ValueError('Board is too large')
+    if max_cells is not None and len(board) * cols > max_cells:
+        raise ValueError('Board is too large')
+    for row in board:
+        for cell in row:
+            if not isinstance(cell, int) or isinstance(cell, bool) or not FLAGGED <= cell <= 8:
+                raise ValueError('Cells must be integers between -2 and 8')
+    if not isinstance(mines, int) or isinstance(mines, bool) or mines < 0:
+        raise ValueError('Mines must be a non-negative integer')
+
+
+def board_key(board, mines):
+    """Stable hash of a board state, used as the cache key."""
+    digest = hashlib.sha256(f'{len(board)}x{len(board[0])}/{mines}:'.encode('ascii'))
+    for row in board:
+        digest.update(bytes(cell - FLAGGED for cell in row))
+    return digest.hexdigest()
+
+
+def _constraints(board):
+    rows, cols = len(board), len(board[0])
+    covered = []
+    constraints = []
+    for r in range(rows):
+        for c in range(cols):
+            value = board[r][c]
+            if value < 0:
+                covered.append(r * cols + c)
+                continue
+            unknown = tuple(
+                (r + dr) * cols + c + dc
+                for dr, dc in _NEIGHBOURS
+                if 0 <= r + dr < rows and 0 <= c + dc < cols and board[r + dr][c + dc] < 0
+            )
+            if value > len(unknown):
+                raise InconsistentBoard('A number has more mines than covered neighbours')
+            if unknown:
+                constraints.append((unknown, value))
+    return covered, constraints
+
+
+def _components(constraints):
+    # Union-find over cells; cells sharing a constraint are in one component
+    parent = {}
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cells, _ in constraints:
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        root = find(cells[0])
+        for cell in cells[1:]:
+            parent[find(cell)] = root
+
+    groups = {}
+    for constraint in constraints:
+        groups.setdefault(find(constraint[0][0]), []).append(constraint)
+    return list(groups.values())
+
+
+def _ordered_cells(constraints):
+    # Breadth-first order keeps the set of partially assigned constraints
+    # small, which is what makes the memoisation effective
+    neighbours = {}
+    for cells, _ in constraints:
+        for cell in cells:
+            neighbours.setdefault(cell, set()).update(cells)
+
+    order = []
+    seen = set()
+    for start in sorted(neighbours):
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            order.append(cell)
+            for other in sorted(neighbours[cell] - seen):
+                seen.add(other)
+                queue.append(other)
+    return order
+
+
+def _enumerate(constraints, deadline, max_steps):
+    """Count a component's solutions by mine count.
+
+    Returns (cells, {mines: (ways, [ways cell i is a mine for each cell])}).
+    """
+    cells = _ordered_cells(constraints)
+    if len(cells) > MAX_COMPONENT_SIZE:
+        raise _OutOfBudget()
+    position = {cell: i for i, cell in enumerate(cells)}
+    size = len(cells)
+
+    indexed = [sorted(position[cell] for cell in group) for group, _ in constraints]
+    remaining = [needed for _, needed in constraints]
+
+    # For each cell: the constraints it is in, with how many of their cells come later
+    constraints_of = [[] for _ in range(size)]
+    for c, members in enumerate(indexed):
+        for offset, i in enumerate(members):
+            constraints_of[i].append((c, len(members) - offset - 1))
+
+    # Constraints already started but not finished when cell i is assigned;
+    # together with i they fully determine the remaining subproblem
+    active = [[] for _ in range(size + 1)]
+    for c, members in enumerate(indexed):
+        for i in range(members[0] + 1, members[-1] + 1):
+            active[i].append(c)
+
+    memo = {}
+    calls = [0]
+
+    def solve(i):
+        if i == size:
+            return {0: (1, [])}
+
+        key = (i, tuple(remaining[c] for c in active[i]))
+        cached = memo.get(key)
+        if cached is not None:
+            return cached
+
+        calls[0] += 1
+        if max_steps is not None and calls[0] > max_steps:
+            raise _OutOfBudget()
+        if deadline is not None and calls[0] & 0xFF == 0 and time.monotonic() > deadline:
+            raise _OutOfBudget()
+
+        result = {}
+        for mine in (0, 1):
+            if any(not 0 <= remaining[c] - mine <= later for c, later in constraints_of[i]):
+                continue
+            for c, _ in constraints_of[i]:
+                remaining[c] -= mine
+            sub = solve(i + 1)
+            for c, _ in constraints_of[i]:
+                remaining[c] += mine
+
+            for mines, (ways, counts) in sub.items():
+                entry = result.setdefault(mines + mine, [0, [0] * (size - i)])
+                entry[0] += ways
+                totals = entry[1]
+                if mine:
+                    totals[0] += ways
+                for j, count in enumerate(counts, 1):
+                    totals[j] += count
+
+        result = {mines: (ways, totals) for mines, (ways, totals) in result.items()}
+        memo[key] = result
+        return result
+
+    return cells, solve(0)
+
+
+def _check(deadline):
+    if deadline is not None and time.monotonic() > deadline:
+        raise _OutOfBudget()
+
+
+def _log(value):
+    return math.log(value) if value > 0 else -math.inf
+
+
+def _log_comb(n, r):
+    if r < 0 or r > n:
+        return -math.inf
+    return math.lgamma(n + 1) - math.lgamma(r + 1) - math.lgamma(n - r + 1)
+
+
+def _log_sum_exp(values):
+    values = [value for value in values if value != -math.inf]
+    if not values:
+        return -math.inf
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def _convolve(a, b, deadline=None):
+    result = {}
+    for i, x in a.items():
+        _check(deadline)
+        for j, y in b.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result
+
+
+def _exact(covered, constraints, mines, deadline, max_steps):
+    solved = [_enumerate(group, deadline, max_steps) for group in _components(constraints)]
+    distributions = [{k: ways for k, (ways, _) in solutions.items()} for _, solutions in solved]
+
+    frontier = {cell for cells, _ in solved for cell in cells}
+    interior = len(covered) - len(frontier)
+
+    # Prefix and suffix products give each component the distribution of all the others
+    # The deadline is checked throughout, not just while enumerating: with
+    # hundreds of components combining them costs more than solving them
+    prefix = [{0: 1}]
+    for distribution in distributions:
+        prefix.append(_convolve(prefix[-1], distribution, deadline))
+    suffix = [{0: 1}]
+    for distribution in reversed(distributions):
+        suffix.append(_convolve(suffix[-1], distribution, deadline))
+    suffix.reverse()
+
+    total = prefix[-1]
+    log_weight = _log_sum_exp([_log(ways) + _log_comb(interior, mines - k) for k, ways in total.items()])
+    if log_weight == -math.inf:
+        raise InconsistentBoard('The mine count does not match the board')
+
+    probabilities = {}
+    for index, (cells, solutions) in enumerate(solved):
+        others = _convolve(prefix[index], suffix[index + 1], deadline)
+        # Log weight of every completion outside this component, per mine count inside it
+        outside = {}
+        for k in solutions:
+            _check(deadline)
+            outside[k] = _log_sum_exp([_log(ways) + _log_comb(interior, mines - k - j) for j, ways in others.items()])
+        for position, cell in enumerate(cells):
+            _check(deadline)
+            log_mine = _log_sum_exp([_log(counts[position]) + outside[k] for k, (_, counts) in solutions.items()])
+            probabilities[cell] = math.exp(log_mine - log_weight)
+
+    if interior:
+        log_mine = _log_sum_exp([_log(ways) + _log_comb(interior - 1, mines - k - 1) for k, ways in total.items()])
+        interior_probability = math.exp(log_mine - log_weight)
+        for cell in covered:
+            if cell not in frontier:
+                probabilities[cell] = interior_probability
+    return probabilities
+
+
+def _approximate(covered, constraints, mines):
+    # Each frontier cell takes the highest local mine density of its numbers
+    probabilities = {}
+    for cells, needed in constraints:
+        density = needed / len(cells)
+        for cell in cells:
+            probabilities[cell] = max(probabilities.get(cell, 0.0), density)
+
+    interior = [cell for cell in covered if cell not in probabilities]
+    if interior:
+        expected = (mines - sum(probabilities.values())) / len(interior)
+        for cell in interior:
+            probabilities[cell] = min(max(expected, 0.0), 1.0)
+    return probabilities
+
+
+def compute_hint(board, mines, deadline=None, max_steps=None):
+    """Mine probability for every covered cell of ``board``.
+
+    Falls back to a local-density approximation (``exact=False``) when the
+    exact count hasn't finished by ``deadline``, a time.monotonic() value,
+    or needs more than ``max_steps`` enumeration steps for one component.
+    Only a step limit keeps the result independent of machine speed.
+    Raises InconsistentBoard if no layout of ``mines`` mines fits the board.
+    """
+    covered, constraints = _constraints(board)
+    if mines > len(covered):
+        raise InconsistentBoard('More mines than covered cells')
+
+    try:
+        probabilities = _exact(covered, constraints, mines, deadline, max_steps)
+        exact = True
+    except _OutOfBudget:
+        probabilities = _approximate(covered, constraints, mines)
+        exact = False
+
+    cols = len(board[0])
+    grid = [[None] * cols for _ in board]
+    for cell, probability in probabilities.items():
+        grid[cell // cols][cell % cols] = round(probability, 6)
+    return HintResult(grid, exact)
+
+
+def safest_cell(probabilities):
+    """(row, col, probability) of the covered cell least likely to be a mine."""
+    best = None
+    for r, row in enumerate(probabilities):
+        for c, probability in enumerate(row):
+            if probability is not None and (best is None or probability < best[2]):
+                best = (r, c, probability)
+    return best
@@ -0,0 +1,72 @@
+"""Move game_stats.difficulty (a free string) to difficulty_id.
+
+Run as part of migrate_schema.py, which covers the primary and every
+shard. Each distinct name found is registered in the difficulties table,
+the new column is filled from it and the old string column is dropped.
+The column is then made NOT NULL and indexed, with a foreign key to
+difficulties on the primary (shards don't hold that table). SQLite can't
+alter columns, so there it is only indexed. Tables that have already been
+migrated are skipped.
+"""
+from sqlalchemy import inspect, text
+
+from models import db, Difficulty, difficulties
+
+# Rows whose difficulty was NULL are kept under this name
+UNKNOWN = 'UNKNOWN'
+INDEX_NAME = 'ix_game_stats_difficulty_id'
+FOREIGN_KEY_NAME = 'fk_game_stats_difficulty_id'
+
+
+def _register(name):
+    spec = difficulties.get(name, register=True)
+    if spec is None:
+        # Keep legacy names we can't parse; they have no board size
+        difficulty = Difficulty(name=name, rows=0, cols=0, mines=0)
+        db.session.add(difficulty)
+        db.session.commit()
+        spec = difficulties.get(name)
+    return spec
+
+
+def migrate_table(engine):
+    """Migrate the game_stats table on one engine. Returns rows updated."""
+    columns = {column['name'] for column in inspect(engine).get_columns('game_stats')}
+    if 'difficulty' not in columns:
+        return 0
+
+    with engine.begin() as connection:
+        names = connection.execute(text(
+            f"SELECT DISTINCT COALESCE(difficulty, '{UNKNOWN}') FROM game_stats"
+        )).scalars().all()
+    ids = {name: _register(name).id for name in names}
+
+    updated = 0
+    with engine.begin() as connection:
+        if 'difficulty_id' not in columns:
+            connection.execute(text('ALTER TABLE game_stats ADD COLUMN difficulty_id SMALLINT'))
+        for name, difficulty_id in ids.items():
+            result = connection.execute(
+                text(f"UPDATE game_stats SET difficulty_id = :id WHERE COALESCE(difficulty, '{UNKNOWN}') = :name"),
+                {'id': difficulty_id, 'name': name}
+            )
+            updated += result.rowcount
+        connection.execute(text('ALTER TABLE game_stats DROP COLUMN difficulty'))
+        _add_constraints(connection, 'difficulties' in inspect(connection).get_table_names())
+    return updated
+
+
+def _add_constraints(connection, foreign_key):
+    # Match the model: NOT NULL, indexed, and a foreign key where possible
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        connection.execute(text('ALTER TABLE game_stats MODIFY difficulty_id SMALLINT NOT NULL'))
+    elif dialect == 'postgresql':
+        connection.execute(text('ALTER TABLE game_stats ALTER COLUMN difficulty_id SET NOT NULL'))
+    connection.execute(text(f'CREATE INDEX {INDEX_NAME} ON game_stats (difficulty_id)'))
+    if foreign_key and dialect != 'sqlite':
+        connection.execute(text(
+            f'ALTER TABLE game_stats ADD CONSTRAINT {FOREIGN_KEY_NAME} '
+            'FOREIGN KEY (difficulty_id) REFERENCES difficulties (id)'
+        ))
+
@@ -0,0 +1,67 @@
+"""Upgrade an existing database to the current models.
+
+db.create_all() creates missing tables but never alters existing ones, so
+run this once after upgrading and before starting the new version:
+
+    python migrate_schema.py
+
+Columns and indexes added to existing tables are created on the primary and on every
+shard holding the table, then game_stats.difficulty is moved to
+difficulty_id (see migrate_difficulties.py). Steps that have already
+been applied are skipped, so it is safe to run again.
+"""
+from sqlalchemy import inspect, text
+
+from app import create_app
+from migrate_difficulties import migrate_table
+from models import db
+from sharding import shards
+
+# (table, column, definition) for columns added to tables that already existed
+ADDED_COLUMNS = [
+    ('users', 'is_admin', 'BOOLEAN NOT NULL DEFAULT FALSE'),
+    ('game_stats', 'seed', 'BIGINT'),
+]
+
+# (table, index, column) for indexes on those columns, named as create_all() names them
+ADDED_INDEXES = [
+    ('game_stats', 'ix_game_stats_seed', 'seed'),
+]
+
+
+def add_columns(engine):
+    """Add any missing ADDED_COLUMNS and ADDED_INDEXES on one engine. Returns what was added."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as connection:
+        for table, column, definition in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            if column in {existing['name'] for existing in inspector.get_columns(table)}:
+                continue
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+            added.append(f'{table}.{column}')
+        for table, index, column in ADDED_INDEXES:
+            if table not in tables:
+                continue
+            if index in {existing['name'] for existing in inspector.get_indexes(table)}:
+                continue
+            connection.execute(text(f'CREATE INDEX {index} ON {table} ({column})'))
+            added.append(index)
+    return added
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        engines = [db.engine] + [db.engines[key] for key in shards.shard_keys]
+        for engine in engines:
+            added = add_columns(engine)
+            updated = migrate_table(engine)
+            print(f'{engine.url.render_as_string()}: added {", ".join(added) or "no columns"}, '
+                  f'migrated {updated} game_stats rows')
+
+
+if __name__ == '__main__':
+    main()
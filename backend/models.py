@@ -1,7 +1,14 @@
+import re
+from collections import namedtuple
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -10,11 +17,17 @@ class User(db.Model):
     username = db.Column(db.String(50), unique=True, nullable=False)
     password = db.Column(db.String(100), nullable=False)  # Will store hashed password
     email = db.Column(db.String(100), unique=True, nullable=True)
+    is_admin = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship with GameStats
     game_stats = db.relationship('GameStats', backref='user', lazy=True, 
-                                 cascade="all, delete-orphan")    
+                                 cascade="all, delete-orphan")
+    refresh_tokens = db.relationship('RefreshToken', backref='user', lazy=True,
+                                     cascade="all, delete-orphan")
+    achievements = db.relationship('UserAchievements', lazy=True, uselist=False,
+                                   cascade="all, delete-orphan")
+    
     def __repr__(self):
         return f'<User {self.username}>'
     
@@ -26,6 +39,175 @@ class User(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class RefreshToken(db.Model):
+    __tablename__ = 'refresh_tokens'
+    
+    # Only a SHA-256 of the token is stored; tokens issued by rotating one
+    # another share a family so a reused token can revoke the whole chain
+    id = db.Column(db.Integer, primary_key=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    family_id = db.Column(db.String(32), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    used_at = db.Column(db.DateTime, nullable=True)  # set once rotated
+    revoked_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<RefreshToken {self.id} - User {self.user_id}>'
+
+class Difficulty(db.Model):
+    __tablename__ = 'difficulties'
+    
+    # SmallInteger keeps game_stats rows and indexes compact; SQLite only
+    # auto-increments INTEGER primary keys
+    id = db.Column(db.SmallInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    name = db.Column(db.String(20), unique=True, nullable=False)
+    rows = db.Column(db.Integer, nullable=False)
+    cols = db.Column(db.Integer, nullable=False)
+    mines = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<Difficulty {self.name}>'
+
+class DifficultySpec(namedtuple('DifficultySpec', ['id', 'name', 'rows', 'cols', 'mines'])):
+    # Cached, detached view of a Difficulty row
+    __slots__ = ()
+    
+    def to_dict(self):
+        return {'name': self.name, 'rows': self.rows, 'cols': self.cols, 'mines': self.mines}
+
+# Built-in levels, matching the frontend's GameControls
+PRESET_DIFFICULTIES = [
+    DifficultySpec(1, 'EASY', 9, 9, 10),
+    DifficultySpec(2, 'MEDIUM', 16, 16, 40),
+    DifficultySpec(3, 'HARD', 16, 30, 99),
+]
+
+# Custom boards are named WxH/M, e.g. 30x16/99
+CUSTOM_DIFFICULTY = re.compile(r'^(\d{1,4})x(\d{1,4})/(\d{1,7})$')
+MAX_BOARD_SIDE = 1000
+
+class RegistryFull(Exception):
+    """No more custom difficulties can be registered."""
+
+class DifficultyRegistry:
+    """Map difficulty names to their compact ids, cached per app.
+
+    Rows are read from the primary on a cache miss, so a custom board
+    registered by another worker is picked up the first time it is seen.
+    Custom boards are only registered when a game on them is saved, and
+    at most DIFFICULTY_REGISTRY_LIMIT rows are kept since ids are small.
+    """
+    
+    def init_app(self, app):
+        app.config.setdefault('DIFFICULTY_REGISTRY_LIMIT', 10000)
+        if app.config['DIFFICULTY_REGISTRY_LIMIT'] > 32767:
+            raise ValueError('DIFFICULTY_REGISTRY_LIMIT must fit a SMALLINT id')
+        app.extensions['difficulty_registry'] = {'by_name': {}, 'by_id': {}}
+    
+    @property
+    def _cache(self):
+        return current_app.extensions['difficulty_registry']
+    
+    def _remember(self, difficulty):
+        spec = DifficultySpec(difficulty.id, difficulty.name, difficulty.rows, difficulty.cols, difficulty.mines)
+        self._cache['by_name'][spec.name] = spec
+        self._cache['by_id'][spec.id] = spec
+        return spec
+    
+    def _load(self, **criteria):
+        # Always read the registry from the primary, replicas may lag
+        query = db.select(Difficulty).filter_by(**criteria)
+        difficulty = db.session.execute(query, bind_arguments={'bind': db.engine}).scalar_one_or_none()
+        return self._remember(difficulty) if difficulty else None
+    
+    def seed(self):
+        """Insert the preset difficulties if they are missing."""
+        for preset in PRESET_DIFFICULTIES:
+            if not db.session.get(Difficulty, preset.id, bind_arguments={'bind': db.engine}):
+                db.session.add(Difficulty(**preset._asdict()))
+        db.session.commit()
+        self.all()
+    
+    def all(self):
+        """Every registered difficulty, ordered by id."""
+        query = db.select(Difficulty).order_by(Difficulty.id)
+        rows = db.session.execute(query, bind_arguments={'bind': db.engine}).scalars()
+        return [self._remember(difficulty) for difficulty in rows]
+    
+    def presets(self):
+        return [self.by_id(preset.id) for preset in PRESET_DIFFICULTIES]
+    
+    def by_id(self, difficulty_id):
+        spec = self._cache['by_id'].get(difficulty_id)
+        return spec if spec else self._load(id=difficulty_id)
+    
+    def get(self, name, register=False):
+        """Look up a difficulty by name.
+        
+        Custom WxH/M names are looked up by their canonical spelling and
+        registered if ``register`` is True, which only saving a game should
+        ask for. Returns None for unknown or invalid names and raises
+        RegistryFull if the board would need registering but can't be.
+        """
+        if not isinstance(name, str):
+            return None
+        board = parse_custom_difficulty(name)
+        if board:
+            name = custom_difficulty_name(*board)
+        spec = self._cache['by_name'].get(name) or self._load(name=name)
+        if spec or not register or not board:
+            return spec
+        
+        # Registered in a transaction of its own, so the caller's session is
+        # neither committed nor rolled back here
+        limit = current_app.config['DIFFICULTY_REGISTRY_LIMIT']
+        with Session(bind=db.engine) as session:
+            if session.scalar(db.select(db.func.count()).select_from(Difficulty)) >= limit:
+                current_app.logger.warning('Difficulty registry is full, not registering %s', name)
+                raise RegistryFull()
+            cols, rows, mines = board
+            difficulty = Difficulty(name=name, rows=rows, cols=cols, mines=mines)
+            session.add(difficulty)
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another worker registered it first
+                session.rollback()
+                difficulty = session.scalars(db.select(Difficulty).filter_by(name=name)).one()
+            return self._remember(difficulty)
+    
+    def board(self, name):
+        """Like ``get``, but valid custom boards that were never saved are
+        returned unregistered, with an id of None."""
+        spec = self.get(name)
+        if spec is None and isinstance(name, str):
+            board = parse_custom_difficulty(name)
+            if board:
+                cols, rows, mines = board
+                spec = DifficultySpec(None, custom_difficulty_name(*board), rows, cols, mines)
+        return spec
+
+def parse_custom_difficulty(name):
+    """Return (cols, rows, mines) for a valid WxH/M name, else None."""
+    match = CUSTOM_DIFFICULTY.match(name)
+    if not match:
+        return None
+    cols, rows, mines = (int(value) for value in match.groups())
+    if not (2 <= cols <= MAX_BOARD_SIDE and 2 <= rows <= MAX_BOARD_SIDE):
+        return None
+    # Leave room for the mine-free first click and its neighbours
+    if not 1 <= mines <= rows * cols - 9:
+        return None
+    return cols, rows, mines
+
+def custom_difficulty_name(cols, rows, mines):
+    # Canonical spelling, so 030x16/99 and 30x16/99 share a row
+    return f'{cols}x{rows}/{mines}'
+
+difficulties = DifficultyRegistry()
+
 class GameStats(db.Model):
     __tablename__ = 'game_stats'
     
@@ -33,14 +215,31 @@ class GameStats(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     # Game details
-    difficulty = db.Column(db.String(20), nullable=False)  # EASY, MEDIUM, HARD
+    difficulty_id = db.Column(db.SmallInteger, db.ForeignKey('difficulties.id'), nullable=False, index=True)
     time_taken = db.Column(db.Integer, nullable=False)  # in seconds
     is_win = db.Column(db.Boolean, default=False)
     mines_flagged = db.Column(db.Integer, default=0)
     cells_opened = db.Column(db.Integer, default=0)
+    seed = db.Column(db.BigInteger, nullable=True, index=True)  # set for seeded boards, e.g. daily challenges
+    
+    # Timestamps; indexed for the analytics watermark queries. Existing
+    # databases need it added on the primary and every shard:
+    #   CREATE INDEX ix_game_stats_played_at ON game_stats (played_at)
+    played_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    @property
+    def difficulty(self):
+        # Name of the difficulty, e.g. EASY or 30x16/99
+        spec = difficulties.by_id(self.difficulty_id)
+        return spec.name if spec else None
     
-    # Timestamps
-    played_at = db.Column(db.DateTime, default=datetime.utcnow)
+    @difficulty.setter
+    def difficulty(self, name):
+        # Lookup only; custom boards are registered when a game is saved
+        spec = difficulties.get(name)
+        if spec is None:
+            raise ValueError(f'Unknown difficulty: {name}')
+        self.difficulty_id = spec.id
     
     def __repr__(self):
         return f'<GameStats {self.id} - User {self.user_id}>'
@@ -54,5 +253,21 @@ class GameStats(db.Model):
             'is_win': self.is_win,
             'mines_flagged': self.mines_flagged,
             'cells_opened': self.cells_opened,
+            'seed': str(self.seed) if self.seed is not None else None,  # string, too large for JS numbers
             'played_at': self.played_at.isoformat() if self.played_at else None
         }
+
+class UserAchievements(db.Model):
+    __tablename__ = 'user_achievements'
+    
+    # One row per user, stored on the user's shard next to their game stats
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, autoincrement=False)
+    games_played = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    current_streak = db.Column(db.Integer, default=0, nullable=False)
+    longest_streak = db.Column(db.Integer, default=0, nullable=False)
+    badges = db.Column(db.BigInteger, default=0, nullable=False)  # bit i set once ACHIEVEMENTS[i] is earned
+    
+    def __repr__(self):
+        return f'<UserAchievements User {self.user_id}>'
+
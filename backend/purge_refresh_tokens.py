@@ -0,0 +1,21 @@
+"""Delete refresh tokens that can no longer be used.
+
+Expired and revoked tokens, and used ones older than
+REFRESH_TOKEN_REUSE_DETECTION, are already removed for a user each time
+they are issued a token. Run this periodically, e.g. daily from cron, to
+also clear them for users who don't come back:
+
+    python purge_refresh_tokens.py
+"""
+from app import create_app
+from tokens import purge
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        print(f'Deleted {purge()} refresh tokens')
+
+
+if __name__ == '__main__':
+    main()
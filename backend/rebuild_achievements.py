@@ -0,0 +1,31 @@
+"""Recompute user_achievements from game_stats after the rules change.
+
+Run against the primary, or every shard when game stats are sharded:
+
+    python rebuild_achievements.py
+
+Each database is rebuilt in one ordered pass over its game_stats and the
+new rows replace the old ones in a single transaction. Games saved while
+the rebuild runs may be missed, so run it when traffic is quiet.
+"""
+from sqlalchemy.orm import Session
+
+from achievements import rebuild
+from app import create_app
+from models import db
+from sharding import shards
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        engines = [db.engines[key] for key in shards.shard_keys] or [db.engine]
+        for engine in engines:
+            # Writes go through a second connection while games stream in
+            with Session(bind=engine) as read_session, Session(bind=engine) as write_session:
+                users = rebuild(read_session, write_session)
+            print(f'{engine.url.render_as_string()}: rebuilt achievements for {users} users')
+
+
+if __name__ == '__main__':
+    main()
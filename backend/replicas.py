@@ -0,0 +1,123 @@
+import itertools
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+
+# Requests with these methods are allowed to read from a replica
+READ_METHODS = frozenset(['GET', 'HEAD'])
+
+
+class ReplicaRouter:
+    """Pick a read replica bind for read-only requests.
+
+    Replicas listed in REPLICA_BINDS are used round-robin. Each replica is
+    health checked at most once every REPLICA_HEALTH_CHECK_INTERVAL seconds
+    and skipped while unhealthy; with no healthy replica, reads go to the
+    primary.
+
+    After a write (registering, logging in, saving stats), a user's reads
+    are pinned to the primary for READ_YOUR_WRITES_SECONDS so they don't
+    see a lagging replica. Pins are kept per process: with several
+    gunicorn workers, a read handled by a worker other than the one that
+    took the write is not pinned and may still see replica lag.
+    """
+
+    def __init__(self, app=None):
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._health = {}
+        self._pinned = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REPLICA_BINDS', [])
+        app.config.setdefault('REPLICA_HEALTH_CHECK_INTERVAL', 30)
+        app.config.setdefault('READ_YOUR_WRITES_SECONDS', 5)
+        app.extensions['replica_router'] = self
+        app.before_request(self._reset_request)
+
+    def _reset_request(self):
+        # The choice is made once per request, even if the app context is reused
+        g.pop('_read_bind', None)
+
+    def pin_primary(self, user_id):
+        """Send ``user_id``'s reads to the primary for the read-your-writes window."""
+        now = time.monotonic()
+        expires = now + current_app.config['READ_YOUR_WRITES_SECONDS']
+        with self._lock:
+            self._pinned[str(user_id)] = expires
+            if len(self._pinned) > 10000:
+                self._pinned = {key: value for key, value in self._pinned.items() if value > now}
+
+    def is_pinned(self, user_id):
+        expires = self._pinned.get(str(user_id))
+        return expires is not None and expires > time.monotonic()
+
+    def _is_healthy(self, key, engine):
+        now = time.monotonic()
+        healthy, checked_at = self._health.get(key, (True, None))
+        if checked_at is not None and now - checked_at < current_app.config['REPLICA_HEALTH_CHECK_INTERVAL']:
+            return healthy
+
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            healthy = True
+        except Exception:
+            current_app.logger.warning('Read replica %s failed its health check', key)
+            healthy = False
+        self._health[key] = (healthy, now)
+        return healthy
+
+    def choose(self, engines):
+        """Return the next healthy replica bind key, or None for the primary."""
+        keys = current_app.config['REPLICA_BINDS']
+        if not keys:
+            return None
+
+        start = next(self._counter)
+        for offset in range(len(keys)):
+            key = keys[(start + offset) % len(keys)]
+            if self._is_healthy(key, engines[key]):
+                return key
+        return None
+
+    def read_bind(self, engines):
+        """Replica bind key for the current request, or None to use the primary."""
+        if not has_request_context() or request.method not in READ_METHODS:
+            return None
+
+        if '_read_bind' not in g:
+            try:
+                user_id = get_jwt_identity()
+            except RuntimeError:
+                # No token has been verified for this request yet
+                user_id = None
+            if user_id is not None and self.is_pinned(user_id):
+                g._read_bind = None
+            else:
+                g._read_bind = self.choose(engines)
+        return g._read_bind
+
+
+replicas = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """Session that sends reads on the primary bind to a replica when allowed."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engines = self._db.engines
+
+        # Flushes always go to the primary, as do models on other binds
+        if bind is None and not self._flushing and engine is engines.get(None):
+            key = replicas.read_bind(engines)
+            if key is not None:
+                return engines[key]
+        return engine
@@ -1,12 +1,111 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+import heapq
+import time
+from datetime import date, datetime
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
 from flask_bcrypt import Bcrypt
-from models import db, User, GameStats
+from sqlalchemy import func
+from achievements import earned, record_games
+from analytics import analytics
+from boards import MAX_SEED, BoardDescriptor, daily_seed
+from cache import stats_cache
+from models import db, User, GameStats, UserAchievements, RegistryFull, difficulties
+from sharding import shards
+from replicas import replicas
+from write_behind import write_behind
+from export import EXPORT_FORMATS, stream_export, export_filename
+from games import StaleVersion, games
+from hints import InconsistentBoard, board_key, compute_hint, hint_cache, safest_cell, validate_board
+from tokens import InvalidRefreshToken, issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+
+# Largest value of the INT columns in game_stats
+MAX_COUNT = 2 ** 31 - 1
 
 # Initialize blueprint and bcrypt
 api = Blueprint('api', __name__)
 bcrypt = Bcrypt()
 
+def admin_required(fn):
+    """Require a valid access token belonging to an admin user."""
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user = db.session.get(User, get_jwt_identity())
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+def _export_response(queries, prefix):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 400
+
+    gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    mimetype = 'application/gzip' if gzip else EXPORT_FORMATS[fmt]
+
+    response = Response(stream_with_context(stream_export(queries, fmt, gzip)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(prefix, fmt, gzip)}'
+    return response
+
+def _parse_seed(value):
+    # Seeds travel as strings since they exceed the safe integer range in JS
+    if isinstance(value, bool):
+        return None
+    try:
+        seed = int(value)
+    except (TypeError, ValueError):
+        return None
+    return seed if 0 <= seed <= MAX_SEED else None
+
+def _is_count(value):
+    # Non-negative integer that fits an INT column; bools are ints in Python
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_COUNT
+
+def _leaderboard(difficulty, limit, seed=None):
+    # Shared by the difficulty and daily challenge leaderboards
+    key = ('leaderboard', difficulty.id, seed, limit)
+    cached = stats_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    def best_times(session):
+        # Each user's fastest win; users live on a single shard so the
+        # per-shard top N contains every candidate for the global top N
+        query = session.query(
+            GameStats.user_id,
+            func.min(GameStats.time_taken).label('best_time')
+        ).filter(
+            GameStats.difficulty_id == difficulty.id,
+            GameStats.is_win.is_(True)
+        )
+        if seed is not None:
+            query = query.filter(GameStats.seed == seed)
+        return query.group_by(GameStats.user_id).order_by('best_time', GameStats.user_id).limit(limit).all()
+    
+    results = heapq.nsmallest(
+        limit,
+        (tuple(row) for rows in shards.fan_out(best_times) for row in rows),
+        key=lambda row: (row[1], row[0])
+    )
+    
+    user_ids = [user_id for user_id, _ in results]
+    usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
+    
+    leaderboard = [
+        {'rank': rank, 'user_id': user_id, 'username': usernames.get(user_id), 'best_time': best_time}
+        for rank, (user_id, best_time) in enumerate(results, start=1)
+    ]
+    stats_cache.set(key, leaderboard)
+    return leaderboard
+
+def _daily_challenge(day):
+    difficulty = difficulties.board(current_app.config['DAILY_CHALLENGE_DIFFICULTY'])
+    seed = daily_seed(day, current_app.config['DAILY_CHALLENGE_SALT'])
+    return difficulty, seed
+
 # ===== Authentication Routes =====
 
 @api.route('/register', methods=['POST'])
@@ -42,14 +141,20 @@ def register():
     db.session.add(new_user)
     db.session.commit()
     
-    # Generate access token
+    # Generate access and refresh tokens
     str_id = str(new_user.id)
     access_token = create_access_token(identity=str_id)
+    refresh_token = issue_refresh_token(new_user.id)
+    db.session.commit()
+    
+    # The new user isn't on the replicas yet
+    replicas.pin_primary(new_user.id)
     
     return jsonify({
         'message': 'User registered successfully',
         'user': new_user.to_dict(),
-        'access_token': access_token
+        'access_token': access_token,
+        'refresh_token': refresh_token
     }), 201
 
 @api.route('/login', methods=['POST'])
@@ -65,14 +170,18 @@ def login():
     if not user or not bcrypt.check_password_hash(user.password, data['password']):
         return jsonify({'error': 'Invalid username or password'}), 401
     
-    # Generate access token
+    # Generate access and refresh tokens
     str_id = str(user.id)
     access_token = create_access_token(identity=str_id)
+    refresh_token = issue_refresh_token(user.id)
+    db.session.commit()
+    replicas.pin_primary(user.id)
     
     return jsonify({
         'message': 'Login successful',
         'user': user.to_dict(),
-        'access_token': access_token
+        'access_token': access_token,
+        'refresh_token': refresh_token
     }), 200
 
 @api.route('/user', methods=['GET'])
@@ -99,19 +208,60 @@ def save_game_stats():
     if not data or not all(field in data for field in required_fields):
         return jsonify({'error': 'Missing required fields'}), 400
     
+    # Checked here since write-behind answers before the row is written
+    if not isinstance(data['is_win'], bool):
+        return jsonify({'error': 'is_win must be a boolean'}), 400
+    for field in ('time_taken', 'mines_flagged', 'cells_opened'):
+        if not _is_count(data.get(field, 0)):
+            return jsonify({'error': f'{field} must be a non-negative integer'}), 400
+    
+    # Custom WxH/M boards are registered the first time a game on them is saved
+    try:
+        difficulty = difficulties.get(data['difficulty'], register=True)
+    except RegistryFull:
+        return jsonify({'error': 'No more custom boards can be registered'}), 400
+    if difficulty is None:
+        return jsonify({'error': 'Unknown difficulty'}), 400
+    
+    fields = {
+        'user_id': current_user_id,
+        'difficulty_id': difficulty.id,
+        'time_taken': data['time_taken'],
+        'is_win': data['is_win'],
+        'mines_flagged': data.get('mines_flagged', 0),
+        'cells_opened': data.get('cells_opened', 0)
+    }
+    
+    # Games on seeded boards (e.g. the daily challenge) record their seed
+    if data.get('seed') is not None:
+        fields['seed'] = _parse_seed(data['seed'])
+        if fields['seed'] is None:
+            return jsonify({'error': 'Invalid seed'}), 400
+    
+    # In write-behind mode the record is committed later by the flusher
+    if write_behind.enabled:
+        fields['played_at'] = datetime.utcnow()
+        provisional_id = write_behind.submit(fields)
+        if provisional_id is not None:
+            replicas.pin_primary(current_user_id)
+            return jsonify({
+                'message': 'Game stats queued',
+                'provisional_id': provisional_id,
+                'game_stats': GameStats(**fields).to_dict()
+            }), 202
+    
     # Create new game stats record
-    new_stats = GameStats(
-        user_id=current_user_id,
-        difficulty=data['difficulty'],
-        time_taken=data['time_taken'],
-        is_win=data['is_win'],
-        mines_flagged=data.get('mines_flagged', 0),
-        cells_opened=data.get('cells_opened', 0)
-    )
+    new_stats = GameStats(**fields)
     
-    # Save to database
-    db.session.add(new_stats)
-    db.session.commit()
+    # Save to the user's shard
+    session = shards.session_for(current_user_id)
+    session.add(new_stats)
+    record_games(session, [new_stats])
+    session.commit()
+    stats_cache.invalidate_user(current_user_id)
+    
+    # Read this user's history from the primary until replicas catch up
+    replicas.pin_primary(current_user_id)
     
     return jsonify({
         'message': 'Game stats saved successfully',
@@ -124,53 +274,259 @@ def get_user_game_stats():
     current_user_id = get_jwt_identity()
     
     # Get all game stats for the current user
-    stats = GameStats.query.filter_by(user_id=current_user_id).order_by(GameStats.played_at.desc()).all()
+    session = shards.session_for(current_user_id)
+    stats = session.query(GameStats).filter_by(user_id=current_user_id).order_by(GameStats.played_at.desc()).all()
     
     return jsonify({
         'game_stats': [stat.to_dict() for stat in stats]
     }), 200
 
+@api.route('/user/game-stats/export', methods=['GET'])
+@jwt_required()
+def export_user_game_stats():
+    current_user_id = get_jwt_identity()
+
+    # Stream the full history instead of building one large JSON array
+    session = shards.session_for(current_user_id)
+    query = session.query(GameStats).filter_by(user_id=current_user_id).order_by(GameStats.played_at.desc())
+    return _export_response([query], 'game_stats')
+
 @api.route('/user/game-stats/summary', methods=['GET'])
 @jwt_required()
 def get_user_stats_summary():
     current_user_id = get_jwt_identity()
     
+    cache_key = ('summary', str(current_user_id))
+    summary = stats_cache.get(cache_key)
+    if summary is not None:
+        return jsonify(summary), 200
+    
+    session = shards.session_for(current_user_id)
+    
     # Get stats summary
-    total_games = GameStats.query.filter_by(user_id=current_user_id).count()
-    wins = GameStats.query.filter_by(user_id=current_user_id, is_win=True).count()
+    total_games = session.query(GameStats).filter_by(user_id=current_user_id).count()
+    wins = session.query(GameStats).filter_by(user_id=current_user_id, is_win=True).count()
     
     # Get best times for each difficulty level (wins only)
-    difficulties = ['EASY', 'MEDIUM', 'HARD']
-    best_times = {}
-    
-    for difficulty in difficulties:
-        best_game = GameStats.query.filter_by(
-            user_id=current_user_id,
-            difficulty=difficulty,
-            is_win=True
-        ).order_by(GameStats.time_taken).first()
-        
-        if best_game:
-            best_times[difficulty] = best_game.time_taken
-        else:
-            best_times[difficulty] = None
+    best_by_id = dict(session.query(
+        GameStats.difficulty_id,
+        func.min(GameStats.time_taken)
+    ).filter_by(user_id=current_user_id, is_win=True).group_by(GameStats.difficulty_id).all())
+    
+    # Every preset is listed; custom boards only once the user has won one
+    best_times = {difficulty.name: None for difficulty in difficulties.presets()}
+    for difficulty_id, best_time in best_by_id.items():
+        best_times[difficulties.by_id(difficulty_id).name] = best_time
     
     # Calculate win rate
     win_rate = (wins / total_games * 100) if total_games > 0 else 0
     
-    return jsonify({
+    # Streaks and badges are kept up to date as games are saved
+    achievements = session.get(UserAchievements, int(current_user_id))
+    
+    summary = {
         'total_games': total_games,
         'wins': wins,
         'win_rate': round(win_rate, 2),
-        'best_times': best_times
+        'best_times': best_times,
+        'current_streak': achievements.current_streak if achievements else 0,
+        'longest_streak': achievements.longest_streak if achievements else 0,
+        'achievements': [achievement.to_dict() for achievement in earned(achievements)]
+    }
+    stats_cache.set(cache_key, summary)
+    return jsonify(summary), 200
+
+@api.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    difficulty = difficulties.get(request.args.get('difficulty', 'EASY'))
+    if difficulty is None:
+        return jsonify({'error': 'Unknown difficulty'}), 404
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    
+    return jsonify({
+        'difficulty': difficulty.name,
+        'leaderboard': _leaderboard(difficulty, limit)
+    }), 200
+
+@api.route('/difficulties', methods=['GET'])
+def get_difficulties():
+    return jsonify({
+        'difficulties': [difficulty.to_dict() for difficulty in difficulties.presets()]
+    }), 200
+
+# ===== Challenge Routes =====
+
+@api.route('/challenge/daily', methods=['GET'])
+def get_daily_challenge():
+    today = datetime.utcnow().date()
+    difficulty, seed = _daily_challenge(today)
+    
+    # Everyone starts from the centre so the whole board is shared
+    first_click = (difficulty.rows // 2) * difficulty.cols + difficulty.cols // 2
+    descriptor = BoardDescriptor(seed, difficulty.rows, difficulty.cols, difficulty.mines, first_click)
+    
+    return jsonify({
+        'date': today.isoformat(),
+        'difficulty': difficulty.name,
+        'seed': str(seed),
+        'rows': difficulty.rows,
+        'cols': difficulty.cols,
+        'mines': difficulty.mines,
+        'first_click': first_click,
+        'board': descriptor.encode()
+    }), 200
+
+@api.route('/challenge/daily/leaderboard', methods=['GET'])
+def get_daily_challenge_leaderboard():
+    try:
+        day = date.fromisoformat(request.args['date']) if 'date' in request.args else datetime.utcnow().date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date'}), 400
+    if day > datetime.utcnow().date():
+        # The response includes the seed, which would give away future boards
+        return jsonify({'error': 'Date is in the future'}), 400
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    
+    difficulty, seed = _daily_challenge(day)
+    return jsonify({
+        'date': day.isoformat(),
+        'difficulty': difficulty.name,
+        'seed': str(seed),
+        'leaderboard': _leaderboard(difficulty, limit, seed)
+    }), 200
+
+# ===== Game Routes =====
+
+@api.route('/games', methods=['POST'])
+@jwt_required()
+def create_game():
+    data = request.get_json(silent=True) or {}
+    
+    # Custom boards aren't registered until a game on them is saved
+    difficulty = difficulties.board(data.get('difficulty', 'EASY'))
+    if difficulty is None:
+        return jsonify({'error': 'Unknown difficulty'}), 400
+    if not games.fits(difficulty):
+        return jsonify({'error': 'Board is too large for a server-held game'}), 400
+    
+    seed = None
+    if data.get('seed') is not None:
+        seed = _parse_seed(data['seed'])
+        if seed is None:
+            return jsonify({'error': 'Invalid seed'}), 400
+    
+    game = games.create(get_jwt_identity(), difficulty, seed)
+    return jsonify({'game': game.to_dict()}), 201
+
+@api.route('/games/<game_id>', methods=['GET'])
+@jwt_required()
+def get_game(game_id):
+    game = games.get(game_id, get_jwt_identity())
+    if game is None:
+        return jsonify({'error': 'Game not found'}), 404
+    return jsonify({'game': game.to_dict(cells=True)}), 200
+
+@api.route('/games/<game_id>/moves', methods=['POST'])
+@jwt_required()
+def make_move(game_id):
+    game = games.get(game_id, get_jwt_identity())
+    if game is None:
+        return jsonify({'error': 'Game not found'}), 404
+    
+    data = request.get_json()
+    if not data or 'action' not in data or 'index' not in data:
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    try:
+        changes = game.move(data['action'], data['index'], data.get('version'))
+    except StaleVersion as e:
+        # The client missed a delta and should reload the full state
+        return jsonify({'error': 'Resync required', 'version': e.version}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    games.touch(game)
+    
+    return jsonify({
+        'version': game.version,
+        'status': game.status,
+        'changes': changes
     }), 200
 
+# ===== Hint Routes =====
+
+@api.route('/hint', methods=['POST'])
+@jwt_required()
+def get_hint():
+    # The budget covers the whole request, not just the exact solver
+    deadline = time.monotonic() + current_app.config['HINT_TIME_BUDGET_MS'] / 1000
+    data = request.get_json()
+    
+    if not data or 'board' not in data or 'mines' not in data:
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    board, mines = data['board'], data['mines']
+    try:
+        validate_board(board, mines, current_app.config['HINT_MAX_CELLS'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Identical board states are common (e.g. repeated hint requests)
+    key = board_key(board, mines)
+    hint = hint_cache.get(key)
+    if hint is None:
+        try:
+            hint = compute_hint(board, mines, deadline)
+        except InconsistentBoard as e:
+            return jsonify({'error': str(e)}), 422
+        hint_cache.set(key, hint)
+    
+    safest = safest_cell(hint.probabilities)
+    
+    return jsonify({
+        'probabilities': hint.probabilities,
+        'safest': {'row': safest[0], 'col': safest[1], 'probability': safest[2]} if safest else None,
+        'exact': hint.exact
+    }), 200
+
+# ===== Admin Routes =====
+
+@api.route('/admin/game-stats/export', methods=['GET'])
+@admin_required
+def export_all_game_stats():
+    queries = [session.query(GameStats).order_by(GameStats.id) for session in shards.sessions()]
+    return _export_response(queries, 'all_game_stats')
+
+@api.route('/admin/analytics', methods=['GET'])
+@admin_required
+def get_analytics():
+    # Served from the background snapshot; age_seconds says how stale it is
+    snapshot = analytics.snapshot()
+    if snapshot is None:
+        response = jsonify({'error': 'Analytics are still being computed'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    return jsonify(snapshot), 200
+
 # ===== Refresh Route =====
 @api.route('/refresh', methods=['POST'])
-@jwt_required()
 def refresh():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    data = request.get_json(silent=True) or {}
+    
+    # Rotate the refresh token; a still valid access token also works. The
+    # access token is only checked without a refresh token, since clients
+    # refresh precisely when the one they send has expired
+    if 'refresh_token' in data:
+        try:
+            current_user_id, refresh_token = rotate_refresh_token(data['refresh_token'])
+        except InvalidRefreshToken:
+            return jsonify({'error': 'Invalid refresh token'}), 401
+    else:
+        verify_jwt_in_request(optional=True)
+        current_user_id, refresh_token = get_jwt_identity(), None
+        if current_user_id is None:
+            return jsonify({'error': 'Refresh token or access token required'}), 401
+    
+    user = db.session.get(User, int(current_user_id))
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -179,7 +535,18 @@ def refresh():
     str_id = str(user.id)
     access_token = create_access_token(identity=str_id)
     
-    return jsonify({
+    response = {
         'message': 'Token refreshed successfully',
         'access_token': access_token
-    }), 200
\ No newline at end of file
+    }
+    if refresh_token:
+        response['refresh_token'] = refresh_token
+    return jsonify(response), 200
+
+@api.route('/logout', methods=['POST'])
+def logout():
+    data = request.get_json(silent=True) or {}
+    
+    # Revokes every token rotated from the same login
+    revoke_refresh_token(data.get('refresh_token'))
+    return jsonify({'message': 'Logged out successfully'}), 200
\ No newline at end of file
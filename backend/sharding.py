@@ -0,0 +1,123 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g
+from sqlalchemy import Column, Index, MetaData, Table
+from sqlalchemy.orm import Session
+
+from models import db, GameStats, UserAchievements
+
+# Models whose rows live on the user's shard instead of the primary bind
+SHARDED_MODELS = [GameStats, UserAchievements]
+
+
+def _shard_metadata():
+    # Shards don't hold the users table, so copy the sharded tables
+    # without their foreign keys
+    metadata = MetaData()
+    for model in SHARDED_MODELS:
+        source = model.__table__
+        table = Table(source.name, metadata, *[
+            Column(column.name, column.type,
+                   primary_key=column.primary_key,
+                   nullable=column.nullable,
+                   index=column.index,
+                   unique=column.unique,
+                   autoincrement=column.autoincrement)
+            for column in source.columns
+        ])
+        for index in source.indexes:
+            if index.name and index.name not in {i.name for i in table.indexes}:
+                Index(index.name, *[table.c[c.name] for c in index.columns], unique=index.unique)
+    return metadata
+
+
+class ShardRouter:
+    """Route game stats for a user to one of the binds in GAME_STATS_SHARDS.
+
+    The shard is chosen by a stable hash of the user id, so a user's rows
+    always live together; the users table stays on the primary bind. When
+    GAME_STATS_SHARDS is empty every call falls back to ``db.session``.
+
+    Auto-increment ids are allocated per shard. Production shards should be
+    configured with distinct auto_increment_offset values so ids stay unique.
+    """
+
+    def __init__(self, app=None):
+        self._metadata = _shard_metadata()
+        self._executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GAME_STATS_SHARDS', [])
+        app.extensions['shard_router'] = self
+        app.teardown_appcontext(self._close_sessions)
+
+    @property
+    def shard_keys(self):
+        return current_app.config['GAME_STATS_SHARDS']
+
+    @property
+    def enabled(self):
+        return bool(self.shard_keys)
+
+    def shard_for(self, user_id):
+        """Return the bind key holding ``user_id``'s rows, or None if unsharded."""
+        keys = self.shard_keys
+        if not keys:
+            return None
+        digest = zlib.crc32(str(int(user_id)).encode('ascii'))
+        return keys[digest % len(keys)]
+
+    def _session(self, key):
+        sessions = g.setdefault('_shard_sessions', {})
+        if key not in sessions:
+            sessions[key] = Session(bind=db.engines[key])
+        return sessions[key]
+
+    def session_for(self, user_id):
+        """Session to use for reads and writes of ``user_id``'s game stats."""
+        key = self.shard_for(user_id)
+        return db.session if key is None else self._session(key)
+
+    def sessions(self):
+        """One session per shard, in shard order."""
+        if not self.enabled:
+            return [db.session]
+        return [self._session(key) for key in self.shard_keys]
+
+    def fan_out(self, fn):
+        """Call ``fn(session)`` on every shard in parallel and return the results.
+
+        Each worker thread gets its own short-lived session because sessions
+        are not thread safe.
+        """
+        if not self.enabled:
+            return [fn(db.session)]
+
+        engines = [db.engines[key] for key in self.shard_keys]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(engines),
+                                                thread_name_prefix='shard-fan-out')
+
+        def run(engine):
+            with Session(bind=engine) as session:
+                return fn(session)
+
+        return list(self._executor.map(run, engines))
+
+    def create_all(self):
+        for key in self.shard_keys:
+            self._metadata.create_all(bind=db.engines[key])
+
+    def drop_all(self):
+        for key in self.shard_keys:
+            self._metadata.drop_all(bind=db.engines[key])
+
+    def _close_sessions(self, exc):
+        for session in g.pop('_shard_sessions', {}).values():
+            session.close()
+
+
+shards = ShardRouter()
@@ -0,0 +1,183 @@
+"""Headless self-play simulator for tuning difficulty settings.
+
+Plays many games per board configuration with the deterministic logic
+player in solver.py and reports the win rate, how many guesses games
+needed and the distribution of the 3BV click metric:
+
+    python simulate.py EASY MEDIUM 30x16/99 --games 1000000 --workers 8 --seed 1
+
+Games are split into chunks spread over a process pool. Each chunk seeds
+its own RNG from (seed, configuration, chunk number), so results only
+depend on the arguments, not on how chunks were scheduled. Aggregates are
+printed as each chunk finishes.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import solver
+from engine import Board, random_layout
+from models import PRESET_DIFFICULTIES, parse_custom_difficulty
+
+
+def board_size(name):
+    """(rows, cols, mines) for a preset name or a WxH/M custom board."""
+    for preset in PRESET_DIFFICULTIES:
+        if preset.name == name.upper():
+            return preset.rows, preset.cols, preset.mines
+    board = parse_custom_difficulty(name)
+    if board is None:
+        raise ValueError(f'Unknown board configuration: {name}')
+    cols, rows, mines = board
+    return rows, cols, mines
+
+
+def chunk_seed(seed, name, chunk):
+    digest = hashlib.sha256(f'{seed}:{name}:{chunk}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def run_chunk(name, games, seed, chunk):
+    """Play ``games`` games of one configuration and return their aggregate."""
+    rows, cols, mines = board_size(name)
+    rng = random.Random(chunk_seed(seed, name, chunk))
+    layout = lambda first: random_layout(rng, rows, cols, mines, first)
+
+    aggregate = Aggregate()
+    started = time.process_time()
+    for _ in range(games):
+        aggregate.add(solver.play(Board(rows, cols, mines, layout)))
+    aggregate.cpu_seconds = time.process_time() - started
+    return name, aggregate
+
+
+def _percentile(counter, fraction):
+    target = fraction * sum(counter.values())
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        if seen >= target:
+            return value
+    return None
+
+
+class Aggregate:
+    """Running totals for one board configuration."""
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.guesses = Counter()
+        self.three_bv = Counter()
+        self.cpu_seconds = 0.0
+
+    def add(self, result):
+        self.games += 1
+        self.wins += result.won
+        self.guesses[result.guesses] += 1
+        self.three_bv[result.three_bv] += 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.wins += other.wins
+        self.guesses.update(other.guesses)
+        self.three_bv.update(other.three_bv)
+        self.cpu_seconds += other.cpu_seconds
+
+    def summary(self):
+        games = self.games or 1
+        return {
+            'games': self.games,
+            'wins': self.wins,
+            'win_rate': round(self.wins / games, 6),
+            'no_guess_games': self.guesses[0],
+            'mean_guesses': round(sum(k * v for k, v in self.guesses.items()) / games, 4),
+            'guesses': {str(k): v for k, v in sorted(self.guesses.items())},
+            'three_bv': {
+                'mean': round(sum(k * v for k, v in self.three_bv.items()) / games, 2),
+                'p10': _percentile(self.three_bv, 0.1),
+                'p50': _percentile(self.three_bv, 0.5),
+                'p90': _percentile(self.three_bv, 0.9),
+                'distribution': {str(k): v for k, v in sorted(self.three_bv.items())},
+            },
+            'games_per_core_second': round(self.games / self.cpu_seconds, 2) if self.cpu_seconds else None,
+        }
+
+
+def simulate(configs, games, workers=1, seed=0, chunk_size=1000, report=None):
+    """Play ``games`` games of every configuration and return their aggregates.
+
+    ``report(name, aggregate, wall_seconds)`` is called after every chunk.
+    """
+    tasks = []
+    for name in configs:
+        board_size(name)
+        for chunk in range(math.ceil(games / chunk_size)):
+            tasks.append((name, min(chunk_size, games - chunk * chunk_size), seed, chunk))
+
+    aggregates = {name: Aggregate() for name in configs}
+    started = time.monotonic()
+
+    def collect(name, aggregate):
+        aggregates[name].merge(aggregate)
+        if report:
+            report(name, aggregates[name], time.monotonic() - started)
+
+    if workers == 1:
+        for task in tasks:
+            collect(*run_chunk(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_chunk, *task) for task in tasks]
+            for future in as_completed(futures):
+                collect(*future.result())
+    return aggregates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure how winnable board configurations are.')
+    parser.add_argument('configs', nargs='+', help='EASY, MEDIUM, HARD or a custom WxH/M board')
+    parser.add_argument('--games', type=int, default=10000, help='games per configuration')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=1000, help='games per task')
+    args = parser.parse_args(argv)
+
+    try:
+        for name in args.configs:
+            board_size(name)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def report(name, aggregate, wall_seconds):
+        summary = aggregate.summary()
+        del summary['guesses'], summary['three_bv']['distribution']
+        summary['games_per_second'] = round(aggregate.games / wall_seconds, 2) if wall_seconds else None
+        print(json.dumps({'config': name, 'final': False, **summary}), flush=True)
+
+    started = time.monotonic()
+    aggregates = simulate(args.configs, args.games, args.workers, args.seed, args.chunk_size, report)
+    wall_seconds = time.monotonic() - started
+
+    for name, aggregate in aggregates.items():
+        print(json.dumps({'config': name, 'final': True, **aggregate.summary()}))
+
+    total_games = sum(aggregate.games for aggregate in aggregates.values())
+    cpu_seconds = sum(aggregate.cpu_seconds for aggregate in aggregates.values())
+    print(
+        f'{total_games} games in {wall_seconds:.1f}s on {args.workers} workers: '
+        f'{total_games / wall_seconds:.1f} games/s, '
+        f'{total_games / cpu_seconds:.1f} games/s per core',
+        file=sys.stderr
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Deterministic logic player used by the self-play simulator.
+
+The player opens the centre cell first, then repeatedly applies the
+single-cell and subset rules. When those find nothing, it asks the hint
+engine for exact probabilities: cells with zero probability are still
+logical moves, otherwise it guesses the least likely mine (lowest index on
+ties) and counts a guess.
+"""
+from collections import namedtuple
+
+from engine import OPENED
+from hints import COVERED, compute_hint
+
+# Enumeration steps allowed per frontier component while stuck. A step
+# limit rather than a time limit, so guesses don't depend on machine speed.
+GUESS_STEP_LIMIT = 200000
+
+GameResult = namedtuple('GameResult', ['won', 'guesses', 'three_bv'])
+
+
+def _constraints(board, known_mines):
+    """(covered cells, mines among them) for every opened number on the frontier."""
+    constraints = []
+    for index in range(board.size):
+        if board.state[index] != OPENED or not board.counts[index]:
+            continue
+        unknown = []
+        needed = board.counts[index]
+        for other in board.neighbours(index):
+            if other in known_mines:
+                needed -= 1
+            elif board.state[other] != OPENED:
+                unknown.append(other)
+        if unknown:
+            constraints.append((frozenset(unknown), needed))
+    return constraints
+
+
+def deduce(board, known_mines):
+    """Cells that are certainly safe; adds certain mines to ``known_mines``."""
+    while True:
+        constraints = _constraints(board, known_mines)
+        safe = set()
+        mines = set()
+        for cells, needed in constraints:
+            if needed == 0:
+                safe |= cells
+            elif needed == len(cells):
+                mines |= cells
+
+        # Subset rule: if A is inside B, B - A holds the difference in mines
+        by_cell = {}
+        for constraint in constraints:
+            for cell in constraint[0]:
+                by_cell.setdefault(cell, []).append(constraint)
+        for cells, needed in set(constraints):
+            candidates = {other for cell in cells for other in by_cell[cell]}
+            for other_cells, other_needed in candidates:
+                if not cells < other_cells:
+                    continue
+                rest = other_cells - cells
+                if other_needed == needed:
+                    safe |= rest
+                elif other_needed - needed == len(rest):
+                    mines |= rest
+
+        mines -= known_mines
+        if not mines:
+            return safe - known_mines
+        known_mines |= mines
+
+
+def _probabilities(board):
+    grid = []
+    for row in range(board.rows):
+        start = row * board.cols
+        grid.append([
+            board.counts[index] if board.state[index] == OPENED else COVERED
+            for index in range(start, start + board.cols)
+        ])
+    return compute_hint(grid, board.mines, max_steps=GUESS_STEP_LIMIT).probabilities
+
+
+def play(board):
+    """Play ``board`` to the end and return a GameResult."""
+    board.open((board.rows // 2) * board.cols + board.cols // 2)
+    known_mines = set()
+    guesses = 0
+
+    while not board.over:
+        safe = deduce(board, known_mines)
+        if safe:
+            for index in sorted(safe):
+                board.open(index)
+            continue
+
+        probabilities = _probabilities(board)
+        best_index, best = None, None
+        for row, values in enumerate(probabilities):
+            for col, probability in enumerate(values):
+                index = row * board.cols + col
+                if probability is None or index in known_mines:
+                    continue
+                if best is None or probability < best:
+                    best_index, best = index, probability
+
+        if best > 0:
+            guesses += 1
+        board.open(best_index)
+
+    return GameResult(board.won, guesses, board.three_bv())
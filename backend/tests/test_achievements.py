@@ -0,0 +1,113 @@
+import json
+import unittest
+from unittest import mock
+from sqlalchemy.orm import Session
+from achievements import new_state, rebuild, record_games
+from app import create_app
+from config import TestingConfig
+from models import db, User, GameStats, UserAchievements
+from flask_bcrypt import Bcrypt
+
+class AchievementsTestCase(unittest.TestCase):
+    """Test case for streaks and achievements."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        self.test_user = User(username="streakuser", password=hashed_password, email="streak@example.com")
+        db.session.add(self.test_user)
+        db.session.commit()
+
+        login_response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "streakuser", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        self.headers = {"Authorization": f"Bearer {json.loads(login_response.data.decode())['access_token']}"}
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _save(self, is_win, difficulty="MEDIUM", time_taken=60):
+        response = self.client.post(
+            "/api/game-stats",
+            data=json.dumps({"difficulty": difficulty, "time_taken": time_taken, "is_win": is_win}),
+            headers=self.headers,
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def _summary(self):
+        response = self.client.get("/api/user/game-stats/summary", headers=self.headers)
+        return json.loads(response.data.decode())
+
+    def test_streaks_in_summary(self):
+        """Test that streaks and badges are reported by the summary."""
+        summary = self._summary()
+        self.assertEqual((summary["current_streak"], summary["longest_streak"], summary["achievements"]), (0, 0, []))
+
+        for is_win in [True] * 5 + [False, True, True]:
+            self._save(is_win)
+        self._save(True, difficulty="HARD")
+
+        summary = self._summary()
+        self.assertEqual(summary["current_streak"], 3)
+        self.assertEqual(summary["longest_streak"], 5)
+        self.assertEqual([a["key"] for a in summary["achievements"]], ["first_win", "streak_5", "hard_win"])
+
+    def test_rebuild_matches_incremental_state(self):
+        """Test that rebuilding from history gives the same state as saving."""
+        for is_win in [True, True, False, True]:
+            self._save(is_win, difficulty="EASY", time_taken=8)
+        state = db.session.get(UserAchievements, self.test_user.id)
+        expected = (state.games_played, state.wins, state.current_streak, state.longest_streak, state.badges)
+
+        # Lose the state, then rebuild it from game_stats
+        db.session.delete(state)
+        db.session.commit()
+        with Session(bind=db.engine) as read_session, Session(bind=db.engine) as write_session:
+            self.assertEqual(rebuild(read_session, write_session, batch_size=1), 1)
+
+        db.session.expire_all()
+        state = db.session.get(UserAchievements, self.test_user.id)
+        self.assertEqual((state.games_played, state.wins, state.current_streak, state.longest_streak, state.badges), expected)
+        self.assertEqual(expected[:4], (4, 3, 1, 2))
+
+    def test_concurrent_first_game(self):
+        """Test that losing the race to create the state row keeps the game."""
+        # Another request created the row after this one found none
+        db.session.add(new_state(self.test_user.id))
+        db.session.commit()
+
+        get = db.session.get
+        lookups = []
+        def racing_get(*args, **kwargs):
+            lookups.append(kwargs)
+            return None if len(lookups) == 1 else get(*args, **kwargs)
+
+        game = GameStats(user_id=self.test_user.id, difficulty="EASY", time_taken=30, is_win=True)
+        with mock.patch.object(db.session, "get", racing_get):
+            db.session.add(game)
+            record_games(db.session, [game])
+            db.session.commit()
+
+        self.assertEqual(len(lookups), 2)
+        # A missing row is never locked, which would take an InnoDB gap lock
+        self.assertNotIn("with_for_update", lookups[0])
+        self.assertTrue(lookups[1]["with_for_update"])
+        self.assertEqual(GameStats.query.filter_by(user_id=self.test_user.id).count(), 1)
+        state = db.session.get(UserAchievements, self.test_user.id)
+        self.assertEqual((state.games_played, state.wins), (1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import time
+import unittest
+from datetime import datetime, timedelta
+from analytics import analytics
+from app import create_app
+from config import TestingConfig
+from models import db, User, GameStats
+from flask_bcrypt import Bcrypt
+
+class AnalyticsTestCase(unittest.TestCase):
+    """Test case for the admin analytics snapshot."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        config = type("AnalyticsTestingConfig", (TestingConfig,), {
+            "ANALYTICS_SETTLE_SECONDS": 1,
+        })
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        self.player = User(username="player", password=hashed_password, email="player@example.com")
+        self.admin = User(username="admin", password=hashed_password, email="admin@example.com", is_admin=True)
+        db.session.add_all([self.player, self.admin])
+        db.session.commit()
+
+        now = self.started = datetime.utcnow()
+        db.session.add_all([
+            # Older than the retention window, only counted in the totals
+            GameStats(user_id=self.player.id, difficulty="EASY", time_taken=30, is_win=True,
+                      played_at=now - timedelta(days=30)),
+            GameStats(user_id=self.player.id, difficulty="EASY", time_taken=40, is_win=False,
+                      played_at=now - timedelta(hours=2)),
+            GameStats(user_id=self.admin.id, difficulty="HARD", time_taken=200, is_win=True,
+                      played_at=now - timedelta(hours=2)),
+        ])
+        db.session.commit()
+
+        self.player_token = self._login("player")
+        self.admin_token = self._login("admin")
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        analytics.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _login(self, username):
+        response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": username, "password": "testpassword"}),
+            content_type="application/json"
+        )
+        return json.loads(response.data.decode())["access_token"]
+
+    def _analytics(self, token):
+        return self.client.get("/api/admin/analytics", headers={"Authorization": f"Bearer {token}"})
+
+    def test_admin_only(self):
+        """Test that only admins can read analytics."""
+        self.assertEqual(self._analytics(self.player_token).status_code, 403)
+
+    def test_not_computed_in_requests(self):
+        """Test that requests never compute the snapshot, the started thread does."""
+        response = self._analytics(self.admin_token)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+
+        analytics.start(self.app)
+        deadline = time.monotonic() + 5
+        while analytics.snapshot() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        data = json.loads(self._analytics(self.admin_token).data.decode())
+        self.assertEqual(data["totals"]["games"], 3)
+
+    def test_snapshot_and_incremental_refresh(self):
+        """Test the first snapshot and that refreshes only add newly settled rows."""
+        analytics.refresh()
+        response = self._analytics(self.admin_token)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertIn("age_seconds", data)
+        self.assertEqual(data["totals"], {"games": 3, "wins": 2, "win_rate": 66.67})
+        self.assertEqual({d["difficulty"]: d["games"] for d in data["by_difficulty"]}, {"EASY": 2, "HARD": 1})
+        self.assertEqual(sum(bucket["games"] for bucket in data["hourly"]), 2)
+        hour = (self.started - timedelta(hours=2)).replace(minute=0, second=0, microsecond=0)
+        self.assertEqual({bucket["hour"] for bucket in data["hourly"]}, {hour.isoformat()})
+        self.assertEqual(data["active_users"]["last_24_hours"], 2)
+        self.assertEqual(data["active_users"]["current_hour"], 0)
+
+        now = datetime.utcnow()
+        db.session.add_all([
+            # Played after the snapshot's watermark, settled by the next refresh
+            GameStats(user_id=self.player.id, difficulty="MEDIUM", time_taken=90, is_win=True,
+                      played_at=now - timedelta(seconds=0.5)),
+            # Too recent; left for a later refresh once it has settled
+            GameStats(user_id=self.player.id, difficulty="MEDIUM", time_taken=95, is_win=True, played_at=now),
+        ])
+        db.session.commit()
+
+        # Reads are served from the snapshot until it is refreshed
+        data = json.loads(self._analytics(self.admin_token).data.decode())
+        self.assertEqual(data["totals"]["games"], 3)
+
+        time.sleep(0.6)
+        analytics.refresh()
+        data = json.loads(self._analytics(self.admin_token).data.decode())
+        self.assertEqual(data["totals"], {"games": 4, "wins": 3, "win_rate": 75.0})
+        self.assertEqual(data["active_users"]["current_hour"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,8 @@ import json
 import unittest
 from app import create_app
 from config import TestingConfig
-from models import db, User, GameStats
+from models import db, User, GameStats, RefreshToken, UserAchievements
+from sqlalchemy import text
 from flask_bcrypt import Bcrypt
 
 class APIIntegrationTestCase(unittest.TestCase):
@@ -164,7 +165,8 @@ class APIIntegrationTestCase(unittest.TestCase):
 import unittest
 from datetime import datetime, timedelta
 from app import create_app
-from models import db, User, GameStats
+from models import db, User, GameStats, RefreshToken, UserAchievements
+from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
 class DatabaseIntegrityTestCase(unittest.TestCase):
@@ -220,39 +222,47 @@ class DatabaseIntegrityTestCase(unittest.TestCase):
         db.session.rollback()
 
     def test_user_delete_cascade(self):
-        """Test that deleting a user cascades to their game stats."""
+        """Test that deleting a user cascades to their game stats, achievements and tokens."""
+        # Enforce foreign keys, as MySQL does
+        db.session.execute(text("PRAGMA foreign_keys=ON"))
+        
         # Create a user
-        user = User(username="cascade_user", password="hashedpwd", email="cascade@example.com")
+        hashed_password = Bcrypt(self.app).generate_password_hash("password123").decode("utf-8")
+        user = User(username="cascade_user", password=hashed_password, email="cascade@example.com")
         db.session.add(user)
         db.session.commit()
         
-        # Add game stats for the user
-        stats1 = GameStats(
-            user_id=user.id,
-            difficulty="EASY",
-            time_taken=30,
-            is_win=True
-        )
-        stats2 = GameStats(
-            user_id=user.id,
-            difficulty="MEDIUM",
-            time_taken=60,
-            is_win=False
+        # Save game stats through the API, which also creates achievements
+        client = self.app.test_client()
+        login_response = client.post(
+            "/api/login",
+            data=json.dumps({"username": "cascade_user", "password": "password123"}),
+            content_type="application/json"
         )
-        db.session.add_all([stats1, stats2])
-        db.session.commit()
+        token = json.loads(login_response.data.decode())["access_token"]
+        for difficulty, is_win in [("EASY", True), ("MEDIUM", False)]:
+            response = client.post(
+                "/api/game-stats",
+                data=json.dumps({"difficulty": difficulty, "time_taken": 30, "is_win": is_win}),
+                headers={"Authorization": f"Bearer {token}"},
+                content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 201)
         
         # Verify game stats exist
         stats_count = GameStats.query.filter_by(user_id=user.id).count()
         self.assertEqual(stats_count, 2)
+        self.assertIsNotNone(db.session.get(UserAchievements, user.id))
         
         # Delete the user
         db.session.delete(user)
         db.session.commit()
         
-        # Verify all associated game stats are deleted
+        # Verify all associated rows are deleted
         stats_count = GameStats.query.filter_by(user_id=user.id).count()
         self.assertEqual(stats_count, 0)
+        self.assertIsNone(db.session.get(UserAchievements, user.id))
+        self.assertEqual(RefreshToken.query.filter_by(user_id=user.id).count(), 0)
 
     def test_timestamps_auto_set(self):
         """Test that timestamps are automatically set on creation."""
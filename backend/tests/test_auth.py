@@ -1,9 +1,12 @@
 import unittest
 import json
+from datetime import datetime, timedelta
 from app import create_app
 from config import TestingConfig
-from models import db, User
+from models import db, User, RefreshToken
+from tokens import purge
 from flask_bcrypt import Bcrypt
+from flask_jwt_extended import create_access_token
 
 class AuthTestCase(unittest.TestCase):
     """Test case for authentication endpoints."""
@@ -120,4 +123,100 @@ class AuthTestCase(unittest.TestCase):
 
         # Test unauthorized access
         response = self.client.get("/api/user")
-        self.assertEqual(response.status_code, 401)  # Unauthorized
\ No newline at end of file
+        self.assertEqual(response.status_code, 401)  # Unauthorized
+
+    def _login(self):
+        response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "existinguser", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        return json.loads(response.data.decode())
+
+    def _refresh(self, refresh_token, headers=None):
+        return self.client.post(
+            "/api/refresh",
+            data=json.dumps({"refresh_token": refresh_token}),
+            headers=headers,
+            content_type="application/json"
+        )
+
+    def test_refresh_token_rotation(self):
+        """Test that refresh tokens rotate and are stored only as hashes."""
+        first = self._login()["refresh_token"]
+        self.assertIsNone(RefreshToken.query.filter_by(token_hash=first).first())
+
+        response = self._refresh(first)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertNotEqual(data["refresh_token"], first)
+
+        # The new access token works
+        response = self.client.get("/api/user", headers={"Authorization": f"Bearer {data['access_token']}"})
+        self.assertEqual(response.status_code, 200)
+
+        # And the rotated token keeps rotating
+        self.assertEqual(self._refresh(data["refresh_token"]).status_code, 200)
+        self.assertEqual(self._refresh("not-a-token").status_code, 401)
+
+    def test_refresh_with_expired_access_token(self):
+        """Test that an expired access token sent along doesn't block the refresh."""
+        refresh_token = self._login()["refresh_token"]
+        user = User.query.filter_by(username="existinguser").first()
+        expired = create_access_token(identity=str(user.id), expires_delta=timedelta(seconds=-1))
+        headers = {"Authorization": f"Bearer {expired}"}
+
+        self.assertEqual(self._refresh(refresh_token, headers).status_code, 200)
+        # Without a refresh token the expired access token is still refused
+        response = self.client.post("/api/refresh", headers=headers, content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_token_reuse_revokes_family(self):
+        """Test that presenting a used refresh token revokes every token from that login."""
+        self.app.config["REFRESH_TOKEN_REUSE_GRACE"] = 0
+        first = self._login()["refresh_token"]
+        other_login = self._login()["refresh_token"]
+        second = json.loads(self._refresh(first).data.decode())["refresh_token"]
+
+        self.assertEqual(self._refresh(first).status_code, 401)
+        self.assertEqual(self._refresh(second).status_code, 401)
+        # Other sessions of the same user are unaffected
+        self.assertEqual(self._refresh(other_login).status_code, 200)
+
+    def test_logout_revokes_refresh_token(self):
+        """Test that logging out revokes the refresh token."""
+        refresh_token = self._login()["refresh_token"]
+        response = self.client.post(
+            "/api/logout",
+            data=json.dumps({"refresh_token": refresh_token}),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._refresh(refresh_token).status_code, 401)
+
+    def test_refresh_token_reuse_grace(self):
+        """Test that two tabs presenting the same token at once both stay logged in."""
+        first = self._login()["refresh_token"]
+        tab_one = self._refresh(first)
+        tab_two = self._refresh(first)
+        self.assertEqual(tab_one.status_code, 200)
+        self.assertEqual(tab_two.status_code, 200)
+        for response in (tab_one, tab_two):
+            self.assertEqual(self._refresh(json.loads(response.data.decode())["refresh_token"]).status_code, 200)
+
+    def test_dead_refresh_tokens_are_deleted(self):
+        """Test that used, expired and revoked tokens are deleted."""
+        self.app.config["REFRESH_TOKEN_REUSE_DETECTION"] = 0
+        first = self._login()["refresh_token"]
+        self.assertEqual(self._refresh(first).status_code, 200)
+
+        # Issuing the next token deleted the used one
+        self.assertEqual(RefreshToken.query.count(), 1)
+        self.assertEqual(self._refresh(first).status_code, 401)
+
+        # purge clears dead tokens of every user
+        self._login()
+        db.session.execute(db.update(RefreshToken).values(expires_at=datetime.utcnow()))
+        db.session.commit()
+        self.assertEqual(purge(), 2)
+        self.assertEqual(RefreshToken.query.count(), 0)
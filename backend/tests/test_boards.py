@@ -0,0 +1,147 @@
+import hashlib
+import json
+import unittest
+from datetime import date, datetime, timedelta
+from app import create_app
+from boards import BoardDescriptor, SplitMix64, daily_seed, generate_mines, mine_bitmap, seeded_layout
+from config import TestingConfig
+from engine import Board
+from models import db, User, GameStats
+from flask_bcrypt import Bcrypt
+
+class SeededBoardTestCase(unittest.TestCase):
+    """Test case for seeded board generation."""
+
+    def test_splitmix64_reference_values(self):
+        """Test the generator against published SplitMix64 outputs."""
+        self.assertEqual(SplitMix64(0).next(), 0xE220A8397B1DCDAF)
+        self.assertEqual(SplitMix64(1234567).next(), 6457827717110365317)
+
+    def test_generation_is_stable(self):
+        """Test that a seed always produces the same board, byte for byte."""
+        mines = generate_mines(12345, 16, 30, 99, 255)
+        self.assertEqual(mines, generate_mines(12345, 16, 30, 99, 255))
+        self.assertEqual(len(set(mines)), 99)
+        # Golden digest; a change here breaks every shared board and other ports
+        self.assertEqual(
+            hashlib.sha256(mine_bitmap(mines, 480)).hexdigest(),
+            "56c15210d7cc17320d22c711144240cbe8c215e2be53e86d0704a600ac8a404c"
+        )
+        self.assertNotEqual(mines, generate_mines(12346, 16, 30, 99, 255))
+
+    def test_first_click_is_safe(self):
+        """Test that seeded boards keep the first click and its neighbours clear."""
+        for seed in range(20):
+            board = Board(9, 9, 10, seeded_layout(seed, 9, 9, 10))
+            board.open(0)
+            self.assertFalse(board.lost)
+            self.assertFalse(any(board.is_mine[i] for i in (0, 1, 9, 10)))
+
+    def test_descriptor_round_trip(self):
+        """Test encoding and decoding a board descriptor."""
+        descriptor = BoardDescriptor(2**63 - 1, 16, 30, 99, 255)
+        token = descriptor.encode()
+        self.assertEqual(len(token), 27)
+        self.assertEqual(BoardDescriptor.decode(token), descriptor)
+        self.assertEqual(BoardDescriptor.decode(token).mine_indices(), generate_mines(2**63 - 1, 16, 30, 99, 255))
+
+        for bad in ("", "not a descriptor", BoardDescriptor(1, 2, 2, 4, 0).encode()):
+            with self.assertRaises(ValueError):
+                BoardDescriptor.decode(bad)
+
+    def test_daily_seed(self):
+        """Test that daily seeds depend on the date and the salt."""
+        day = date(2024, 1, 1)
+        self.assertEqual(daily_seed(day), 6151267519550463487)
+        self.assertNotEqual(daily_seed(day), daily_seed(date(2024, 1, 2)))
+        self.assertNotEqual(daily_seed(day), daily_seed(day, "salt"))
+
+class DailyChallengeTestCase(unittest.TestCase):
+    """Test case for the daily challenge routes."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        self.test_user = User(username="dailyuser", password=hashed_password, email="daily@example.com")
+        db.session.add(self.test_user)
+        db.session.commit()
+
+        login_response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "dailyuser", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        self.access_token = json.loads(login_response.data.decode())["access_token"]
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _save(self, payload):
+        return self.client.post(
+            "/api/game-stats",
+            data=json.dumps(payload),
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            content_type="application/json"
+        )
+
+    def test_daily_challenge(self):
+        """Test that the daily challenge describes today's seeded board."""
+        response = self.client.get("/api/challenge/daily")
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+
+        today = datetime.utcnow().date()
+        self.assertEqual(data["date"], today.isoformat())
+        self.assertEqual(data["difficulty"], "HARD")
+        self.assertEqual(int(data["seed"]), daily_seed(today))
+        self.assertEqual(data["first_click"], 8 * 30 + 15)
+
+        descriptor = BoardDescriptor.decode(data["board"])
+        self.assertEqual(descriptor, (int(data["seed"]), 16, 30, 99, data["first_click"]))
+
+    def test_challenge_leaderboard(self):
+        """Test that only wins on the day's seed are ranked."""
+        day = date(2024, 1, 1)
+        seed = daily_seed(day)
+        self.assertEqual(self._save({"difficulty": "HARD", "time_taken": 150, "is_win": True, "seed": str(seed)}).status_code, 201)
+        self._save({"difficulty": "HARD", "time_taken": 90, "is_win": True, "seed": seed + 1})
+        self._save({"difficulty": "HARD", "time_taken": 80, "is_win": True})
+
+        response = self.client.get("/api/challenge/daily/leaderboard?date=2024-01-01")
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertEqual(data["seed"], str(seed))
+        self.assertEqual([(e["username"], e["best_time"]) for e in data["leaderboard"]], [("dailyuser", 150)])
+
+        saved = GameStats.query.filter_by(time_taken=150).first()
+        self.assertEqual(saved.to_dict()["seed"], str(seed))
+
+        self.assertEqual(self.client.get("/api/challenge/daily/leaderboard?date=yesterday").status_code, 400)
+        # Future boards stay secret
+        tomorrow = (datetime.utcnow().date() + timedelta(days=1)).isoformat()
+        self.assertEqual(self.client.get(f"/api/challenge/daily/leaderboard?date={tomorrow}").status_code, 400)
+        self.assertEqual(self._save({"difficulty": "HARD", "time_taken": 1, "is_win": True, "seed": -1}).status_code, 400)
+
+    def test_summary_cache_invalidated_on_save(self):
+        """Test that a user's cached summary is refreshed after a save."""
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        first = json.loads(self.client.get("/api/user/game-stats/summary", headers=headers).data.decode())
+        self.assertEqual(first["total_games"], 0)
+
+        self._save({"difficulty": "EASY", "time_taken": 30, "is_win": True})
+        second = json.loads(self.client.get("/api/user/game-stats/summary", headers=headers).data.decode())
+        self.assertEqual(second["total_games"], 1)
+        self.assertEqual(second["best_times"]["EASY"], 30)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import gzip
+import json
+import unittest
+from app import create_app
+from config import TestingConfig
+from models import db, User, GameStats
+from compress import brotli
+from flask_bcrypt import Bcrypt
+
+class CompressionTestCase(unittest.TestCase):
+    """Test case for response compression."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        self.test_user = User(username="zipuser", password=hashed_password, email="zip@example.com")
+        db.session.add(self.test_user)
+        db.session.commit()
+        db.session.add_all([
+            GameStats(user_id=self.test_user.id, difficulty="EASY", time_taken=30 + i, is_win=i % 2 == 0)
+            for i in range(200)
+        ])
+        db.session.commit()
+
+        login_response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "zipuser", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        self.access_token = json.loads(login_response.data.decode())["access_token"]
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _get(self, path, encoding):
+        return self.client.get(path, headers={
+            "Authorization": f"Bearer {self.access_token}",
+            "Accept-Encoding": encoding
+        })
+
+    def test_large_response_is_gzipped(self):
+        """Test that a large JSON body is gzipped when the client accepts it."""
+        plain = self._get("/api/user/game-stats", "identity")
+        self.assertNotIn("Content-Encoding", plain.headers)
+
+        response = self._get("/api/user/game-stats", "gzip")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertLess(len(response.data), len(plain.data))
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+
+    def test_small_response_is_not_compressed(self):
+        """Test that responses below COMPRESS_MIN_SIZE are left alone."""
+        response = self._get("/api/user", "gzip, br")
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn("zipuser", response.data.decode())
+
+    def test_streamed_export_is_compressed(self):
+        """Test that streamed exports are compressed chunk by chunk, unless already gzipped."""
+        plain = self._get("/api/user/game-stats/export?format=ndjson", "identity").data
+        response = self._get("/api/user/game-stats/export?format=ndjson", "gzip")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertEqual(gzip.decompress(response.data), plain)
+        self.assertEqual(len(plain.splitlines()), 200)
+
+        # Already gzipped by the export itself
+        response = self._get("/api/user/game-stats/export?format=ndjson&gzip=1", "gzip")
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(gzip.decompress(response.data), plain)
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_preferred(self):
+        """Test that brotli is used when installed and accepted."""
+        plain = self._get("/api/user/game-stats", "identity")
+        response = self._get("/api/user/game-stats", "gzip, br")
+        self.assertEqual(response.headers["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.data), plain.data)
+
+        response = self._get("/api/user/game-stats", "gzip;q=1, br;q=0.5")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+
+if __name__ == "__main__":
+    unittest.main()
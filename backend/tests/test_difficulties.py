@@ -0,0 +1,160 @@
+import json
+import unittest
+from sqlalchemy import create_engine, inspect, text
+from app import create_app
+from config import TestingConfig
+from models import db, User, GameStats, Difficulty, difficulties
+from migrate_difficulties import migrate_table
+from flask_bcrypt import Bcrypt
+
+class DifficultyRegistryTestCase(unittest.TestCase):
+    """Test case for the difficulty registry."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        self.test_user = User(username="boarduser", password=hashed_password, email="board@example.com")
+        db.session.add(self.test_user)
+        db.session.commit()
+
+        login_response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "boarduser", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        self.access_token = json.loads(login_response.data.decode())["access_token"]
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _save(self, difficulty, time_taken=60, is_win=True):
+        return self.client.post(
+            "/api/game-stats",
+            data=json.dumps({"difficulty": difficulty, "time_taken": time_taken, "is_win": is_win}),
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            content_type="application/json"
+        )
+
+    def test_presets_are_seeded(self):
+        """Test that the built-in difficulties exist with their board sizes."""
+        hard = difficulties.get("HARD")
+        self.assertEqual((hard.rows, hard.cols, hard.mines), (16, 30, 99))
+        self.assertEqual([d.name for d in difficulties.presets()], ["EASY", "MEDIUM", "HARD"])
+
+        stats = GameStats(user_id=self.test_user.id, difficulty="HARD", time_taken=100, is_win=True)
+        self.assertEqual(stats.difficulty_id, hard.id)
+        self.assertEqual(stats.difficulty, "HARD")
+
+    def test_custom_board_registered_lazily(self):
+        """Test that a WxH/M board is registered the first time it is saved."""
+        self.assertIsNone(Difficulty.query.filter_by(name="20x10/30").first())
+
+        response = self._save("20x10/30", time_taken=75)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.data.decode())["game_stats"]["difficulty"], "20x10/30")
+
+        custom = Difficulty.query.filter_by(name="20x10/30").one()
+        self.assertEqual((custom.cols, custom.rows, custom.mines), (20, 10, 30))
+
+        # Saving the same board again reuses the registered row
+        self._save("20x10/30", time_taken=70)
+        self.assertEqual(Difficulty.query.filter_by(name="20x10/30").count(), 1)
+
+        response = self.client.get(
+            "/api/user/game-stats/summary",
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        best_times = json.loads(response.data.decode())["best_times"]
+        self.assertEqual(best_times, {"EASY": None, "MEDIUM": None, "HARD": None, "20x10/30": 70})
+
+    def test_invalid_difficulty_rejected(self):
+        """Test that unknown names and impossible boards are rejected."""
+        for name in ["IMPOSSIBLE", "3x3/9", "0x10/5", "5000x5000/10"]:
+            response = self._save(name)
+            self.assertEqual(response.status_code, 400, name)
+        self.assertEqual(Difficulty.query.count(), 3)
+
+    def test_custom_names_are_canonical(self):
+        """Test that differently spelled names of one board share a row."""
+        self.assertEqual(self._save("030x016/0099").status_code, 201)
+        response = self._save("30x16/99")
+        self.assertEqual(json.loads(response.data.decode())["game_stats"]["difficulty"], "30x16/99")
+        self.assertEqual(Difficulty.query.filter(Difficulty.id > 3).count(), 1)
+
+    def test_only_saves_register_custom_boards(self):
+        """Test that reading or starting a custom board doesn't register it."""
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        self.assertEqual(self.client.get("/api/leaderboard?difficulty=20x10/30").status_code, 404)
+        response = self.client.post("/api/games", json={"difficulty": "20x10/30"}, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Difficulty.query.count(), 3)
+
+    def test_registering_leaves_caller_session_alone(self):
+        """Test that registering a board neither commits nor rolls back the caller's work."""
+        with self.assertRaises(ValueError):
+            # The setter only looks boards up
+            GameStats(user_id=self.test_user.id, difficulty="30x16/98", time_taken=1, is_win=True)
+
+        pending = User(username="pending", password="x", email="pending@example.com")
+        db.session.add(pending)
+        with db.session.no_autoflush:
+            spec = difficulties.get("30x16/98", register=True)
+        self.assertIn(pending, db.session.new)
+        self.assertEqual((spec.cols, spec.rows, spec.mines), (30, 16, 98))
+
+        db.session.rollback()
+        self.assertIsNone(User.query.filter_by(username="pending").first())
+        self.assertIsNotNone(Difficulty.query.filter_by(name="30x16/98").first())
+
+    def test_registry_limit(self):
+        """Test that custom registrations stop at DIFFICULTY_REGISTRY_LIMIT."""
+        self.app.config["DIFFICULTY_REGISTRY_LIMIT"] = 4
+        self.assertEqual(self._save("20x10/30").status_code, 201)
+        response = self._save("20x10/31")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("No more custom boards", json.loads(response.data.decode())["error"])
+
+        # Boards that are already registered can still be saved
+        self.assertEqual(self._save("20x10/30").status_code, 201)
+        self.assertEqual(Difficulty.query.count(), 4)
+
+    def test_migrate_string_column(self):
+        """Test migrating a legacy game_stats table with a string difficulty."""
+        legacy = create_engine("sqlite://")
+        with legacy.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE game_stats (id INTEGER PRIMARY KEY, user_id INTEGER, "
+                "difficulty VARCHAR(20), time_taken INTEGER, is_win BOOLEAN)"
+            ))
+            connection.execute(text(
+                "INSERT INTO game_stats (user_id, difficulty, time_taken, is_win) VALUES "
+                "(1, 'EASY', 40, 1), (1, 'HARD', 300, 0), (2, '30x16/99', 200, 1), (2, 'LEGACY', 10, 1), "
+                "(2, '030x16/99', 210, 1)"
+            ))
+
+        self.assertEqual(migrate_table(legacy), 5)
+        columns = {column["name"] for column in inspect(legacy).get_columns("game_stats")}
+        self.assertNotIn("difficulty", columns)
+
+        with legacy.connect() as connection:
+            ids = connection.execute(text("SELECT difficulty_id FROM game_stats ORDER BY id")).scalars().all()
+        self.assertEqual(
+            [difficulties.by_id(difficulty_id).name for difficulty_id in ids],
+            ["EASY", "HARD", "30x16/99", "LEGACY", "30x16/99"]
+        )
+
+        indexes = {index["name"] for index in inspect(legacy).get_indexes("game_stats")}
+        self.assertIn("ix_game_stats_difficulty_id", indexes)
+
+        # Running it again is a no-op
+        self.assertEqual(migrate_table(legacy), 0)
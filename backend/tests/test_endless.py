@@ -0,0 +1,95 @@
+import unittest
+from endless import CHUNK_SIZE, MINE, ChunkedBoard
+from engine import Board, FLAGGED, OPENED
+
+def board_mines(board):
+    """Flat indices of every mine on a bounded chunked board."""
+    mines = []
+    for chunk_y in range(-(-board.rows // CHUNK_SIZE)):
+        for chunk_x in range(-(-board.cols // CHUNK_SIZE)):
+            for mine in board._mines_of(chunk_x, chunk_y):
+                x = chunk_x * CHUNK_SIZE + mine % CHUNK_SIZE
+                y = chunk_y * CHUNK_SIZE + mine // CHUNK_SIZE
+                mines.append(y * board.cols + x)
+    return mines
+
+class ChunkedBoardTestCase(unittest.TestCase):
+    """Test case for the chunked endless board."""
+
+    def test_matches_engine_across_chunks(self):
+        """Test that flood fill and numbers match engine.Board across chunk edges."""
+        # Neither side is a multiple of the chunk size
+        board = ChunkedBoard(7, density=0.08, rows=200, cols=150)
+        opened = board.open(75, 100, limit=10 ** 9)
+        self.assertFalse(board.more)
+        self.assertGreater(board.materialized, 4)
+
+        mines = board_mines(board)
+        reference = Board(200, 150, len(mines), lambda first: mines)
+        expected = reference.open(100 * 150 + 75)
+        self.assertEqual(sorted(y * 150 + x for x, y, _ in opened), sorted(expected))
+        for x, y, count in opened:
+            self.assertEqual(count, reference.counts[y * 150 + x])
+
+    def test_limit_and_resume(self):
+        """Test that a paused fill resumes to the same result."""
+        whole = ChunkedBoard(3, density=0.05)
+        expected = {(x, y) for x, y, _ in whole.open(0, 0, limit=20000)}
+
+        board = ChunkedBoard(3, density=0.05)
+        opened = board.open(0, 0, limit=5000)
+        self.assertEqual(len(opened), 5000)
+        self.assertTrue(board.more)
+        while len(opened) < 20000:
+            opened += board.resume(limit=min(5000, 20000 - len(opened)))
+        self.assertEqual(len(set((x, y) for x, y, _ in opened)), 20000)
+        self.assertEqual(board.opened, 20000)
+        # The endless board reaches negative coordinates too
+        self.assertTrue(any(x < 0 or y < 0 for x, y in expected))
+
+    def test_eviction_keeps_state(self):
+        """Test that evicted chunks come back with their opened and flagged cells."""
+        board = ChunkedBoard(11, density=0.2, max_chunks=2)
+        opened = board.open(10, 10)
+        self.assertFalse(board.lost)
+        flagged = next((x, 40) for x in range(CHUNK_SIZE) if board.cell(x, 40)[1] is None)
+        self.assertEqual(board.toggle_flag(*flagged), [flagged])
+
+        far = [(1000, 1000), (5000, -3000), (-7000, 9000)]
+        for x, y in far:
+            board.cell(x, y)
+        self.assertEqual(board.materialized, 2)
+        self.assertGreaterEqual(board.archived, 1)
+
+        for x, y, count in opened:
+            self.assertEqual(board.cell(x, y), (OPENED, count))
+        self.assertEqual(board.cell(*flagged), (FLAGGED, None))
+
+    def test_flags_and_mines(self):
+        """Test flagging and losing on a mine."""
+        board = ChunkedBoard(5, density=0.3, rows=64, cols=64)
+        self.assertEqual(board.toggle_flag(0, 0), [])
+        board.open(32, 32)
+        self.assertFalse(board.lost)
+        mine = board_mines(board)[0]
+        x, y = mine % 64, mine // 64
+
+        self.assertEqual(board.toggle_flag(x, y), [(x, y)])
+        self.assertEqual(board.cell(x, y), (FLAGGED, None))
+        self.assertEqual(board.open(x, y), [])
+        board.toggle_flag(x, y)
+        self.assertEqual(board.open(x, y), [(x, y, MINE)])
+        self.assertTrue(board.lost)
+        with self.assertRaises(ValueError):
+            board.open(64, 0)
+
+    def test_deterministic(self):
+        """Test that the same seed and first click give the same board."""
+        first = ChunkedBoard(42, density=0.15)
+        second = ChunkedBoard(42, density=0.15)
+        self.assertEqual(first.open(-100, 250), second.open(-100, 250))
+        self.assertEqual(first._mines_of(3, -2), second._mines_of(3, -2))
+        self.assertNotEqual(first._mines_of(3, -2), first._mines_of(-2, 3))
+
+if __name__ == "__main__":
+    unittest.main()
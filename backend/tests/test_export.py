@@ -0,0 +1,114 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+from app import create_app
+from config import TestingConfig
+from models import db, User, GameStats
+from flask_bcrypt import Bcrypt
+
+class ExportTestCase(unittest.TestCase):
+    """Test case for the game stats export endpoints."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        self.player = User(username="player", password=hashed_password, email="player@example.com")
+        self.admin = User(username="admin", password=hashed_password, email="admin@example.com", is_admin=True)
+        db.session.add_all([self.player, self.admin])
+        db.session.commit()
+
+        # Enough rows to span several yield_per batches
+        db.session.add_all([
+            GameStats(
+                user_id=self.player.id,
+                difficulty="EASY",
+                time_taken=30 + i,
+                is_win=i % 2 == 0,
+                mines_flagged=5,
+                cells_opened=40
+            )
+            for i in range(2500)
+        ])
+        db.session.add(GameStats(user_id=self.admin.id, difficulty="HARD", time_taken=200, is_win=False))
+        db.session.commit()
+
+        self.player_token = self._login("player")
+        self.admin_token = self._login("admin")
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _login(self, username):
+        response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": username, "password": "testpassword"}),
+            content_type="application/json"
+        )
+        return json.loads(response.data.decode())["access_token"]
+
+    def test_export_csv(self):
+        """Test exporting the user's history as CSV."""
+        response = self.client.get(
+            "/api/user/game-stats/export?format=csv",
+            headers={"Authorization": f"Bearer {self.player_token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, "text/csv")
+        self.assertIn("game_stats.csv", response.headers["Content-Disposition"])
+
+        rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+        self.assertEqual(len(rows), 2500)
+        self.assertTrue(all(row["user_id"] == str(self.player.id) for row in rows))
+        self.assertEqual(rows[0]["difficulty"], "EASY")
+
+    def test_export_ndjson_gzip(self):
+        """Test exporting the user's history as gzipped NDJSON."""
+        response = self.client.get(
+            "/api/user/game-stats/export?format=ndjson&gzip=1",
+            headers={"Authorization": f"Bearer {self.player_token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/gzip")
+        self.assertIn("game_stats.ndjson.gz", response.headers["Content-Disposition"])
+
+        lines = gzip.decompress(response.data).decode().splitlines()
+        self.assertEqual(len(lines), 2500)
+        self.assertEqual(json.loads(lines[0])["user_id"], self.player.id)
+
+    def test_export_invalid_format(self):
+        """Test that unknown export formats are rejected."""
+        response = self.client.get(
+            "/api/user/game-stats/export?format=xml",
+            headers={"Authorization": f"Bearer {self.player_token}"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_export(self):
+        """Test that only admins can export every user's history."""
+        response = self.client.get(
+            "/api/admin/game-stats/export?format=ndjson",
+            headers={"Authorization": f"Bearer {self.player_token}"}
+        )
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(
+            "/api/admin/game-stats/export?format=ndjson",
+            headers={"Authorization": f"Bearer {self.admin_token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = response.data.decode().splitlines()
+        self.assertEqual(len(lines), 2501)
+        self.assertEqual({json.loads(line)["user_id"] for line in lines}, {self.player.id, self.admin.id})
@@ -0,0 +1,135 @@
+import json
+import unittest
+from app import create_app
+from boards import generate_mines
+from config import TestingConfig
+from games import MINE
+from hints import COVERED, FLAGGED
+from models import db, User
+from flask_bcrypt import Bcrypt
+
+class GameMovesTestCase(unittest.TestCase):
+    """Test case for server-held games and delta moves."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        for username in ("player", "other"):
+            hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+            db.session.add(User(username=username, password=hashed_password, email=f"{username}@example.com"))
+        db.session.commit()
+        self.headers = self._login("player")
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _login(self, username):
+        response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": username, "password": "testpassword"}),
+            content_type="application/json"
+        )
+        return {"Authorization": f"Bearer {json.loads(response.data.decode())['access_token']}"}
+
+    def _create(self, **payload):
+        response = self.client.post("/api/games", data=json.dumps(payload), headers=self.headers,
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data.decode())["game"]
+
+    def _move(self, game_id, action, index, version=None, headers=None):
+        payload = {"action": action, "index": index}
+        if version is not None:
+            payload["version"] = version
+        return self.client.post(f"/api/games/{game_id}/moves", data=json.dumps(payload),
+                                headers=headers or self.headers, content_type="application/json")
+
+    def test_moves_return_only_changed_cells(self):
+        """Test that moves return packed deltas that rebuild the full state."""
+        game = self._create(difficulty="HARD", seed="99")
+        self.assertEqual((game["rows"], game["cols"], game["version"]), (16, 30, 0))
+
+        first = 8 * 30 + 15
+        mines = set(generate_mines(99, 16, 30, 99, first))
+        cells = [COVERED] * (16 * 30)
+
+        response = self._move(game["id"], "open", first, version=0)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertEqual(data["version"], 1)
+        changes = data["changes"]
+        self.assertEqual(len(changes) % 2, 0)
+        self.assertLess(len(changes), 2 * 16 * 30)
+        for index, value in zip(changes[::2], changes[1::2]):
+            cells[index] = value
+
+        flag = min(mines)
+        data = json.loads(self._move(game["id"], "flag", flag, version=1).data.decode())
+        self.assertEqual(data["changes"], [flag, FLAGGED])
+        cells[flag] = FLAGGED
+
+        # A move that changes nothing keeps the version
+        data = json.loads(self._move(game["id"], "open", first, version=2).data.decode())
+        self.assertEqual((data["changes"], data["version"]), ([], 2))
+
+        full = json.loads(self.client.get(f"/api/games/{game['id']}", headers=self.headers).data.decode())["game"]
+        self.assertEqual(full["cells"], cells)
+        self.assertEqual(full["version"], 2)
+
+    def test_stale_version_needs_resync(self):
+        """Test that a client behind the server gets a 409 with the current version."""
+        game = self._create(difficulty="EASY")
+        self._move(game["id"], "open", 40, version=0)
+
+        response = self._move(game["id"], "flag", 0, version=0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.data.decode())["version"], 1)
+
+    def test_losing_reveals_mines(self):
+        """Test that opening a mine ends the game and reveals every mine."""
+        game = self._create(difficulty="EASY", seed=5)
+        self._move(game["id"], "open", 0)
+        mine = generate_mines(5, 9, 9, 10, 0)[0]
+
+        data = json.loads(self._move(game["id"], "open", mine).data.decode())
+        self.assertEqual(data["status"], "lost")
+        revealed = dict(zip(data["changes"][::2], data["changes"][1::2]))
+        self.assertEqual(set(revealed), set(generate_mines(5, 9, 9, 10, 0)))
+        self.assertEqual(set(revealed.values()), {MINE})
+
+    def test_errors(self):
+        """Test bad moves and games belonging to other users."""
+        game = self._create(difficulty="EASY")
+        self.assertEqual(self._move(game["id"], "dig", 0).status_code, 400)
+        self.assertEqual(self._move(game["id"], "open", 81).status_code, 400)
+        self.assertEqual(self._move("missing", "open", 0).status_code, 404)
+        self.assertEqual(self._move(game["id"], "open", 0, headers=self._login("other")).status_code, 404)
+
+    def test_board_size_limit(self):
+        """Test that boards over GAME_MAX_CELLS can't be held on the server."""
+        self.assertEqual(self._create(difficulty="100x100/1000")["rows"], 100)
+        response = self.client.post("/api/games", data=json.dumps({"difficulty": "500x500/1000"}),
+                                    headers=self.headers, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_store_bounded_by_memory(self):
+        """Test that the least recently used games are dropped beyond GAME_STORE_MAX_BYTES."""
+        store = self.app.extensions["games"]
+        store.maxweight = 3 * (2048 + 3 * 480)
+        created = [self._create(difficulty="HARD") for _ in range(4)]
+        self.assertEqual(len(store), 3)
+        self.assertLessEqual(store.weight, store.maxweight)
+        self.assertEqual(self._move(created[0]["id"], "open", 0).status_code, 404)
+        self.assertEqual(self._move(created[3]["id"], "open", 0).status_code, 200)
+
+if __name__ == "__main__":
+    unittest.main()
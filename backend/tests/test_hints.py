@@ -0,0 +1,194 @@
+import itertools
+import json
+import random
+import time
+import unittest
+from app import create_app
+from config import TestingConfig
+from models import db, User
+from flask_bcrypt import Bcrypt
+from hints import COVERED, HINT_CACHE_BYTES, HintResult, InconsistentBoard, compute_hint, hint_cache
+
+def brute_force(board, mines):
+    """Exact probabilities by trying every placement of the mines."""
+    rows, cols = len(board), len(board[0])
+    covered = [(r, c) for r in range(rows) for c in range(cols) if board[r][c] < 0]
+    counts = {cell: 0 for cell in covered}
+    total = 0
+    for layout in itertools.combinations(covered, mines):
+        layout = set(layout)
+        consistent = all(
+            board[r][c] == sum(
+                (r + dr, c + dc) in layout
+                for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (dr, dc) != (0, 0)
+            )
+            for r in range(rows) for c in range(cols) if board[r][c] >= 0
+        )
+        if consistent:
+            total += 1
+            for cell in layout:
+                counts[cell] += 1
+    return {cell: count / total for cell, count in counts.items()}
+
+def random_board(rng, rows, cols, mines, opened):
+    """A board with a random subset of its safe cells opened."""
+    cells = [(r, c) for r in range(rows) for c in range(cols)]
+    layout = set(rng.sample(cells, mines))
+    board = [[COVERED] * cols for _ in range(rows)]
+    safe = [cell for cell in cells if cell not in layout]
+    for r, c in rng.sample(safe, min(opened, len(safe))):
+        board[r][c] = sum(
+            (r + dr, c + dc) in layout
+            for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (dr, dc) != (0, 0)
+        )
+    return board
+
+class HintEngineTestCase(unittest.TestCase):
+    """Test case for the mine probability engine."""
+
+    def test_matches_brute_force(self):
+        """Test that exact probabilities match exhaustive enumeration."""
+        rng = random.Random(1234)
+        for _ in range(40):
+            rows, cols = rng.randint(3, 5), rng.randint(3, 5)
+            mines = rng.randint(1, 5)
+            board = random_board(rng, rows, cols, mines, rng.randint(1, rows * cols - mines))
+
+            hint = compute_hint(board, mines, deadline=time.monotonic() + 5)
+            self.assertTrue(hint.exact)
+            for (r, c), probability in brute_force(board, mines).items():
+                self.assertAlmostEqual(hint.probabilities[r][c], probability, places=5)
+
+    def test_independent_components(self):
+        """Test a board whose frontier splits into separate components."""
+        board = [
+            [1, COVERED, COVERED, COVERED, COVERED, 1],
+            [1, COVERED, COVERED, COVERED, COVERED, 1],
+        ]
+        hint = compute_hint(board, 2, deadline=time.monotonic() + 5)
+        for (r, c), probability in brute_force(board, 2).items():
+            self.assertAlmostEqual(hint.probabilities[r][c], probability, places=5)
+        self.assertIsNone(hint.probabilities[0][0])
+
+    def test_inconsistent_board(self):
+        """Test that impossible numbers are reported."""
+        with self.assertRaises(InconsistentBoard):
+            compute_hint([[3, COVERED], [COVERED, 0]], 2, deadline=time.monotonic() + 5)
+        with self.assertRaises(InconsistentBoard):
+            compute_hint([[1, COVERED], [COVERED, COVERED]], 0, deadline=time.monotonic() + 5)
+
+    def test_falls_back_when_out_of_time(self):
+        """Test that a passed deadline returns an approximate answer."""
+        rng = random.Random(99)
+        board = random_board(rng, 16, 30, 99, 200)
+        hint = compute_hint(board, 99, deadline=0)
+        self.assertFalse(hint.exact)
+        for r, row in enumerate(board):
+            for c, cell in enumerate(row):
+                if cell < 0:
+                    self.assertTrue(0 <= hint.probabilities[r][c] <= 1)
+
+    def test_deadline_covers_combining_components(self):
+        """Test that the deadline holds on boards with hundreds of small components."""
+        rng = random.Random(5)
+        board = random_board(rng, 100, 100, 3000, 400)
+        start = time.monotonic()
+        hint = compute_hint(board, 3000, deadline=start + 0.2)
+        self.assertFalse(hint.exact)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_cache_is_bounded_by_size(self):
+        """Test that the hint cache evicts by result size, not just by count."""
+        hint_cache.clear()
+        big = HintResult([[0.5] * 100 for _ in range(100)], True)
+        for key in range(200):
+            hint_cache.set(key, big)
+        self.assertLessEqual(hint_cache.weight, HINT_CACHE_BYTES)
+        self.assertLess(len(hint_cache), 200)
+        hint_cache.clear()
+
+    def test_step_limit_is_deterministic(self):
+        """Test that a step limit falls back the same way on every run."""
+        rng = random.Random(99)
+        board = random_board(rng, 16, 30, 99, 200)
+        limited = [compute_hint(board, 99, max_steps=1) for _ in range(2)]
+        self.assertFalse(limited[0].exact)
+        self.assertEqual(limited[0], limited[1])
+        self.assertTrue(compute_hint(board, 99).exact)
+
+class HintAPITestCase(unittest.TestCase):
+    """Test case for the hint endpoint."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        hint_cache.clear()
+
+        hashed_password = Bcrypt(self.app).generate_password_hash("testpassword").decode("utf-8")
+        db.session.add(User(username="hintuser", password=hashed_password, email="hint@example.com"))
+        db.session.commit()
+        login_response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "hintuser", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        self.access_token = json.loads(login_response.data.decode())["access_token"]
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _hint(self, payload):
+        return self.client.post(
+            "/api/hint",
+            data=json.dumps(payload),
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            content_type="application/json"
+        )
+
+    def test_hint_returns_safest_cell(self):
+        """Test that the endpoint returns probabilities and the safest cell."""
+        board = [
+            [0, 1, COVERED],
+            [1, 2, COVERED],
+            [COVERED, COVERED, COVERED],
+        ]
+        response = self._hint({"board": board, "mines": 2})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertTrue(data["exact"])
+        self.assertIsNone(data["probabilities"][0][0])
+
+        safest = data["safest"]
+        expected = brute_force(board, 2)
+        self.assertAlmostEqual(safest["probability"], min(expected.values()), places=5)
+        self.assertAlmostEqual(expected[(safest["row"], safest["col"])], safest["probability"], places=5)
+
+        # The second request for the same board is served from the cache
+        self.assertEqual(len(hint_cache), 1)
+        self.assertEqual(self._hint({"board": board, "mines": 2}).status_code, 200)
+        self.assertEqual(len(hint_cache), 1)
+
+    def test_hint_validation(self):
+        """Test that malformed and impossible boards are rejected."""
+        self.assertEqual(self._hint({"board": [[0, COVERED]]}).status_code, 400)
+        self.assertEqual(self._hint({"board": [[0, COVERED], [1]], "mines": 1}).status_code, 400)
+        self.assertEqual(self._hint({"board": [[9, COVERED]], "mines": 1}).status_code, 400)
+        self.assertEqual(self._hint({"board": [[2, COVERED]], "mines": 1}).status_code, 422)
+
+    def test_hint_limits(self):
+        """Test that hints need a login and that large boards are rejected."""
+        response = self.client.post("/api/hint", data=json.dumps({"board": [[COVERED]], "mines": 0}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+        board = [[COVERED] * 101 for _ in range(100)]
+        response = self._hint({"board": board, "mines": 10})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(hint_cache), 0)
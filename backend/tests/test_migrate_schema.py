@@ -0,0 +1,78 @@
+import json
+import unittest
+from unittest import mock
+from sqlalchemy import create_engine, inspect, text
+from app import create_app
+from config import TestingConfig
+from models import db
+from migrate_schema import add_columns
+import migrate_schema
+from flask_bcrypt import Bcrypt
+
+class SchemaMigrationTestCase(unittest.TestCase):
+    """Test case for upgrading a database created by an earlier version."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        # Tables as the first release created them
+        db.drop_all()
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL UNIQUE, "
+                "password VARCHAR(100) NOT NULL, email VARCHAR(100) UNIQUE, created_at DATETIME)"
+            ))
+            connection.execute(text(
+                "CREATE TABLE game_stats (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                "difficulty VARCHAR(20) NOT NULL, time_taken INTEGER NOT NULL, is_win BOOLEAN, "
+                "mines_flagged INTEGER, cells_opened INTEGER, played_at DATETIME)"
+            ))
+        db.create_all()
+        password = Bcrypt(self.app).generate_password_hash("testpassword").decode("utf-8")
+        with db.engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (username, password) VALUES ('olduser', :password)"),
+                               {"password": password})
+            connection.execute(text(
+                "INSERT INTO game_stats (user_id, difficulty, time_taken, is_win, played_at) "
+                "VALUES (1, 'HARD', 200, 1, '2024-01-01 12:00:00')"
+            ))
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _login(self):
+        return self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "olduser", "password": "testpassword"}),
+            content_type="application/json"
+        )
+
+    def test_upgrade_existing_database(self):
+        """Test that an old database works after migrate_schema and that it can run twice."""
+        with mock.patch.object(migrate_schema, "create_app", return_value=self.app):
+            migrate_schema.main()
+            migrate_schema.main()
+        self.assertEqual(add_columns(db.engine), [])
+
+        columns = {column["name"] for column in inspect(db.engine).get_columns("users")}
+        self.assertIn("is_admin", columns)
+        indexes = {index["name"] for index in inspect(db.engine).get_indexes("game_stats")}
+        self.assertIn("ix_game_stats_seed", indexes)
+
+        response = self._login()
+        self.assertEqual(response.status_code, 200)
+        access_token = json.loads(response.data.decode())["access_token"]
+        response = self.client.get("/api/user/game-stats", headers={"Authorization": f"Bearer {access_token}"})
+        self.assertEqual(response.status_code, 200)
+        games = json.loads(response.data.decode())["game_stats"]
+        self.assertEqual([game["difficulty"] for game in games], ["HARD"])
+
+if __name__ == "__main__":
+    unittest.main()
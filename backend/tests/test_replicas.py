@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import create_engine
+from app import create_app
+from config import TestingConfig
+from models import db, User
+from replicas import replicas
+from flask_bcrypt import Bcrypt
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    """Test case for routing reads to replica binds."""
+
+    def setUp(self):
+        """Set up the test environment with SQLite files standing in for replicas."""
+        self.replica_dir = tempfile.mkdtemp()
+        replicas._health.clear()
+        replicas._pinned.clear()
+        self.binds = binds = {
+            "replica0": "sqlite:///" + os.path.join(self.replica_dir, "replica0.db"),
+            "replica1": "sqlite:///" + os.path.join(self.replica_dir, "replica1.db"),
+        }
+        config = type("ReplicaTestingConfig", (TestingConfig,), {
+            "SQLALCHEMY_BINDS": binds,
+            "REPLICA_BINDS": list(binds),
+        })
+
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        db.session.add(User(username="primary", password=hashed_password))
+        db.session.commit()
+
+        # Give each replica a copy of the user under a different name so
+        # responses show which database served them
+        for key in binds:
+            engine = db.engines[key]
+            db.metadata.create_all(bind=engine)
+            with engine.begin() as connection:
+                connection.execute(User.__table__.insert(), {
+                    "id": 1, "username": key, "password": hashed_password, "is_admin": False
+                })
+
+        response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "primary", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        self.access_token = json.loads(response.data.decode())["access_token"]
+        # Logging in pins the user; start each test from unpinned reads
+        replicas._pinned.clear()
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        db.drop_all()
+        for engine in db.engines.values():
+            engine.dispose()
+        self.app_context.pop()
+        # Flask-SQLAlchemy keeps a metadata per bind key across apps
+        for key in self.binds:
+            db.metadatas.pop(key, None)
+        shutil.rmtree(self.replica_dir)
+
+    def _profile_username(self):
+        response = self.client.get("/api/user", headers={"Authorization": f"Bearer {self.access_token}"})
+        return json.loads(response.data.decode())["user"]["username"]
+
+    def test_reads_round_robin_across_replicas(self):
+        """Test that GET requests alternate between the replicas."""
+        served_by = [self._profile_username() for _ in range(4)]
+        self.assertEqual(set(served_by), {"replica0", "replica1"})
+        self.assertNotEqual(served_by[0], served_by[1])
+        self.assertEqual(served_by[0], served_by[2])
+
+    def test_unhealthy_replica_is_skipped(self):
+        """Test that a replica failing its health check receives no reads."""
+        engines = {
+            "replica0": db.engines["replica0"],
+            "replica1": create_engine("sqlite:///" + os.path.join(self.replica_dir, "missing", "replica1.db")),
+        }
+        with self.app.test_request_context("/api/user"):
+            chosen = [replicas.choose(engines) for _ in range(4)]
+        self.assertEqual(chosen, ["replica0"] * 4)
+        self.assertFalse(replicas._health["replica1"][0])
+
+        # With every replica down, reads fall back to the primary
+        replicas._health["replica0"] = (False, float("inf"))
+        self.assertEqual(self._profile_username(), "primary")
+
+    def test_writes_pin_reads_to_primary(self):
+        """Test that a user's reads go to the primary right after they save stats."""
+        self.assertNotEqual(self._profile_username(), "primary")
+
+        response = self.client.post(
+            "/api/game-stats",
+            data=json.dumps({"difficulty": "EASY", "time_taken": 30, "is_win": True}),
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._profile_username(), "primary")
+
+        response = self.client.get(
+            "/api/user/game-stats",
+            headers={"Authorization": f"Bearer {self.access_token}"}
+        )
+        self.assertEqual(len(json.loads(response.data.decode())["game_stats"]), 1)
+
+    def test_register_pins_reads_to_primary(self):
+        """Test that a new user's profile is read from the primary, where it exists."""
+        response = self.client.post(
+            "/api/register",
+            data=json.dumps({"username": "newcomer", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        token = json.loads(response.data.decode())["access_token"]
+
+        response = self.client.get("/api/user", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode())["user"]["username"], "newcomer")
@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import text
+from app import create_app
+from config import TestingConfig
+from models import db, User
+from sharding import shards
+from flask_bcrypt import Bcrypt
+
+SHARD_COUNT = 3
+
+class ShardingTestCase(unittest.TestCase):
+    """Test case for routing game stats across shard binds."""
+
+    def setUp(self):
+        """Set up the test environment with SQLite files standing in for shards."""
+        self.shard_dir = tempfile.mkdtemp()
+        self.binds = binds = {
+            f"shard{i}": "sqlite:///" + os.path.join(self.shard_dir, f"shard{i}.db")
+            for i in range(SHARD_COUNT)
+        }
+        config = type("ShardedTestingConfig", (TestingConfig,), {
+            "SQLALCHEMY_BINDS": binds,
+            "GAME_STATS_SHARDS": list(binds),
+        })
+
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        self.users = [
+            User(username=f"player{i}", password=hashed_password, email=f"player{i}@example.com")
+            for i in range(8)
+        ]
+        db.session.add_all(self.users)
+        db.session.commit()
+        self.tokens = {user.id: self._login(user.username) for user in self.users}
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        db.session.remove()
+        shards.drop_all()
+        db.drop_all()
+        for engine in db.engines.values():
+            engine.dispose()
+        self.app_context.pop()
+        # Flask-SQLAlchemy keeps a metadata per bind key across apps
+        for key in self.binds:
+            db.metadatas.pop(key, None)
+        shutil.rmtree(self.shard_dir)
+
+    def _login(self, username):
+        response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": username, "password": "testpassword"}),
+            content_type="application/json"
+        )
+        return json.loads(response.data.decode())["access_token"]
+
+    def _save(self, user_id, time_taken, is_win=True, difficulty="EASY"):
+        return self.client.post(
+            "/api/game-stats",
+            data=json.dumps({"difficulty": difficulty, "time_taken": time_taken, "is_win": is_win}),
+            headers={"Authorization": f"Bearer {self.tokens[user_id]}"},
+            content_type="application/json"
+        )
+
+    def _rows_on(self, key):
+        with db.engines[key].connect() as connection:
+            return connection.execute(text("SELECT user_id FROM game_stats")).scalars().all()
+
+    def test_shard_assignment_is_stable(self):
+        """Test that a user always maps to the same shard."""
+        for user in self.users:
+            self.assertEqual(shards.shard_for(user.id), shards.shard_for(str(user.id)))
+            self.assertIn(shards.shard_for(user.id), self.app.config["GAME_STATS_SHARDS"])
+        self.assertGreater(len({shards.shard_for(user.id) for user in self.users}), 1)
+
+    def test_writes_and_reads_use_user_shard(self):
+        """Test that a user's stats are written to and read from their shard only."""
+        for user in self.users:
+            self.assertEqual(self._save(user.id, 40 + user.id).status_code, 201)
+
+        for key in self.app.config["GAME_STATS_SHARDS"]:
+            expected = sorted(user.id for user in self.users if shards.shard_for(user.id) == key)
+            self.assertEqual(sorted(self._rows_on(key)), expected)
+
+        # The primary database holds no game stats
+        with db.engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT COUNT(*) FROM game_stats")).scalar(), 0)
+
+        user = self.users[0]
+        response = self.client.get(
+            "/api/user/game-stats/summary",
+            headers={"Authorization": f"Bearer {self.tokens[user.id]}"}
+        )
+        data = json.loads(response.data.decode())
+        self.assertEqual(data["total_games"], 1)
+        self.assertEqual(data["best_times"]["EASY"], 40 + user.id)
+
+    def test_leaderboard_fans_out_across_shards(self):
+        """Test that the leaderboard merges every shard's fastest wins."""
+        for user in self.users:
+            self._save(user.id, 100 - user.id)
+            self._save(user.id, 200)
+            self._save(user.id, 10, is_win=False)
+
+        response = self.client.get("/api/leaderboard?difficulty=EASY&limit=5")
+        self.assertEqual(response.status_code, 200)
+        leaderboard = json.loads(response.data.decode())["leaderboard"]
+
+        expected = sorted(self.users, key=lambda user: 100 - user.id)[:5]
+        self.assertEqual([entry["username"] for entry in leaderboard], [user.username for user in expected])
+        self.assertEqual([entry["best_time"] for entry in leaderboard], [100 - user.id for user in expected])
+        self.assertEqual([entry["rank"] for entry in leaderboard], [1, 2, 3, 4, 5])
+
+        # Out of range limits are clamped to 1..100
+        response = self.client.get("/api/leaderboard?difficulty=EASY&limit=-3")
+        self.assertEqual(len(json.loads(response.data.decode())["leaderboard"]), 1)
@@ -0,0 +1,89 @@
+import random
+import unittest
+from engine import Board, OPENED, random_layout
+from simulate import board_size, simulate
+import solver
+
+def fixed_layout(mines):
+    return lambda first: mines
+
+class EngineTestCase(unittest.TestCase):
+    """Test case for the server-side board engine."""
+
+    def test_first_click_is_safe(self):
+        """Test that mines avoid the first click and its neighbours."""
+        rng = random.Random(7)
+        for _ in range(50):
+            board = Board(9, 9, 10, lambda first: random_layout(rng, 9, 9, 10, first))
+            board.open(40)
+            self.assertFalse(board.lost)
+            self.assertEqual(sum(board.is_mine), 10)
+            self.assertFalse(any(board.is_mine[i] for i in [40] + list(board.neighbours(40))))
+
+    def test_flood_fill_and_win(self):
+        """Test that opening a zero opens its region and the last safe cell wins."""
+        # Single mine in the bottom-right corner of a 4x4 board
+        board = Board(4, 4, 1, fixed_layout([15]))
+        changed = board.open(0)
+        self.assertEqual(len(changed), 15)
+        self.assertEqual(board.opened, 15)
+        self.assertTrue(board.won)
+        self.assertEqual(board.counts[10], 1)
+        self.assertEqual(board.three_bv(), 1)
+
+    def test_flags_and_mines(self):
+        """Test flag toggling and losing on a mine."""
+        board = Board(3, 3, 2, fixed_layout([7, 8]))
+        board.open(0)
+        self.assertFalse(board.over)
+        self.assertEqual(board.toggle_flag(8), [8])
+        self.assertEqual(board.flags, 1)
+        self.assertEqual(board.open(8), [])
+        self.assertEqual(board.toggle_flag(8), [8])
+        self.assertEqual(board.toggle_flag(0), [])
+
+        board = Board(3, 3, 1, fixed_layout([8]))
+        board.open(4)
+        self.assertEqual(board.open(8), [8])
+        self.assertTrue(board.lost)
+        self.assertEqual(board.state[8], OPENED)
+
+    def test_three_bv(self):
+        """Test 3BV on a board with one opening and isolated numbers."""
+        # Mines at (0,2) and (2,2) in a 3x5 board
+        board = Board(3, 5, 2, fixed_layout([2, 12]))
+        board.place_mines([2, 12])
+        # Left opening covers columns 0-1, right opening covers columns 3-4
+        # and the cell between the mines is an isolated number
+        self.assertEqual(board.three_bv(), 3)
+
+class SimulatorTestCase(unittest.TestCase):
+    """Test case for the logic player and the self-play simulator."""
+
+    def test_solver_needs_no_guess_for_trivial_board(self):
+        """Test that a fully deducible board is won without guessing."""
+        board = Board(4, 4, 1, fixed_layout([15]))
+        result = solver.play(board)
+        self.assertTrue(result.won)
+        self.assertEqual(result.guesses, 0)
+
+    def test_board_size(self):
+        """Test parsing presets and custom boards."""
+        self.assertEqual(board_size("HARD"), (16, 30, 99))
+        self.assertEqual(board_size("20x10/30"), (10, 20, 30))
+        with self.assertRaises(ValueError):
+            board_size("IMPOSSIBLE")
+
+    def test_results_are_deterministic(self):
+        """Test that results depend only on the seed, not the chunking order."""
+        first = simulate(["EASY"], games=30, workers=1, seed=5, chunk_size=10)["EASY"]
+        second = simulate(["EASY"], games=30, workers=2, seed=5, chunk_size=10)["EASY"]
+        self.assertEqual(first.games, 30)
+        self.assertEqual(first.wins, second.wins)
+        self.assertEqual(first.guesses, second.guesses)
+        self.assertEqual(first.three_bv, second.three_bv)
+
+        summary = first.summary()
+        self.assertEqual(sum(summary["guesses"].values()), 30)
+        self.assertTrue(0 <= summary["win_rate"] <= 1)
+        self.assertGreater(summary["three_bv"]["mean"], 0)
@@ -0,0 +1,117 @@
+import json
+import unittest
+from datetime import datetime
+from app import create_app
+from config import TestingConfig
+from models import db, User, GameStats, UserAchievements
+from write_behind import write_behind
+from flask_bcrypt import Bcrypt
+
+class WriteBehindTestCase(unittest.TestCase):
+    """Test case for write-behind ingestion of game stats."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        config = type("WriteBehindTestingConfig", (TestingConfig,), {
+            "GAME_STATS_WRITE_BEHIND": True,
+            "WRITE_BEHIND_FLUSH_MS": 50,
+        })
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        self.bcrypt = Bcrypt(self.app)
+
+        hashed_password = self.bcrypt.generate_password_hash("testpassword").decode("utf-8")
+        self.test_user = User(username="queueuser", password=hashed_password, email="queue@example.com")
+        db.session.add(self.test_user)
+        db.session.commit()
+
+        login_response = self.client.post(
+            "/api/login",
+            data=json.dumps({"username": "queueuser", "password": "testpassword"}),
+            content_type="application/json"
+        )
+        self.access_token = json.loads(login_response.data.decode())["access_token"]
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        write_behind.drain()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _save(self, time_taken):
+        return self.client.post(
+            "/api/game-stats",
+            data=json.dumps({"difficulty": "EASY", "time_taken": time_taken, "is_win": True}),
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            content_type="application/json"
+        )
+
+    def test_save_returns_accepted(self):
+        """Test that queued saves return 202 with a provisional id."""
+        response = self._save(30)
+        self.assertEqual(response.status_code, 202)
+        data = json.loads(response.data.decode())
+        self.assertIn("provisional_id", data)
+        self.assertEqual(data["game_stats"]["time_taken"], 30)
+        self.assertIsNotNone(data["game_stats"]["played_at"])
+
+    def test_drain_commits_queued_stats(self):
+        """Test that draining the queue writes every accepted record."""
+        provisional_ids = set()
+        for i in range(20):
+            response = self._save(30 + i)
+            provisional_ids.add(json.loads(response.data.decode())["provisional_id"])
+        self.assertEqual(len(provisional_ids), 20)
+
+        write_behind.drain()
+        self.assertEqual(write_behind.pending(), 0)
+
+        db.session.expire_all()
+        times = sorted(stats.time_taken for stats in GameStats.query.filter_by(user_id=self.test_user.id))
+        self.assertEqual(times, list(range(30, 50)))
+
+        # The flusher keeps streaks up to date too
+        achievements = db.session.get(UserAchievements, self.test_user.id)
+        self.assertEqual((achievements.games_played, achievements.current_streak), (20, 20))
+
+    def test_strict_mode_is_synchronous(self):
+        """Test that disabling write-behind keeps the synchronous response."""
+        self.app.config["GAME_STATS_WRITE_BEHIND"] = False
+        response = self._save(30)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(write_behind.pending(), 0)
+        self.assertEqual(GameStats.query.filter_by(user_id=self.test_user.id).count(), 1)
+
+    def test_invalid_fields_rejected_before_queueing(self):
+        """Test that wrongly typed fields get a 400 instead of a 202."""
+        response = self.client.post(
+            "/api/game-stats",
+            data=json.dumps({"difficulty": "EASY", "time_taken": 30, "is_win": "yes"}),
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(write_behind.pending(), 0)
+
+    def test_bad_record_only_drops_itself(self):
+        """Test that one failing record doesn't lose the rest of its batch."""
+        def fields(time_taken, is_win=True):
+            return {"user_id": self.test_user.id, "difficulty_id": 1, "time_taken": time_taken,
+                    "is_win": is_win, "mines_flagged": 0, "cells_opened": 0, "played_at": datetime.utcnow()}
+
+        batch = [(self.app, fields(30)), (self.app, fields(31, is_win="yes")), (self.app, fields(32))]
+        with self.assertLogs("write_behind.dead_letter", level="ERROR") as logs:
+            write_behind.flush(batch)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(json.loads(logs.records[0].getMessage())["time_taken"], 31)
+
+        db.session.expire_all()
+        times = sorted(stats.time_taken for stats in GameStats.query.filter_by(user_id=self.test_user.id))
+        self.assertEqual(times, [30, 32])
+        achievements = db.session.get(UserAchievements, self.test_user.id)
+        self.assertEqual(achievements.games_played, 2)
@@ -0,0 +1,127 @@
+"""Rotating refresh tokens.
+
+Refresh tokens are random strings handed to the client once; the server
+keeps only their SHA-256, so checking one is a single indexed lookup
+rather than a bcrypt verification. Each refresh marks the presented token
+used and issues the next one in the same family. Presenting a used token
+again means it was copied, so the whole family is revoked and both the
+thief and the real client have to log in again.
+
+Browser tabs share one stored token, so two tabs may present it at the
+same moment. Within REFRESH_TOKEN_REUSE_GRACE seconds of its first use a
+token is therefore exchanged again, for another token in the same family,
+instead of being treated as stolen.
+
+Rows are deleted once they are expired or revoked, and used rows once
+they are older than REFRESH_TOKEN_REUSE_DETECTION; reuse of a token that
+old is rejected without revoking its family. This happens for a user
+whenever they are issued a token, and for everyone with ``purge``.
+"""
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_
+
+from models import db, RefreshToken
+
+
+class InvalidRefreshToken(Exception):
+    """The refresh token is unknown, expired, revoked or was reused."""
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _find(token):
+    # Tokens are always checked on the primary, replicas may lag
+    query = db.select(RefreshToken).filter_by(token_hash=_hash(token))
+    return db.session.execute(query, bind_arguments={'bind': db.engine}).scalar_one_or_none()
+
+
+def _revoke_family(family_id, now):
+    db.session.execute(
+        db.update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+
+
+def _dead(now):
+    # Rows that can neither be exchanged nor reveal reuse any more
+    detection = timedelta(seconds=current_app.config['REFRESH_TOKEN_REUSE_DETECTION'])
+    return or_(
+        RefreshToken.expires_at <= now,
+        RefreshToken.revoked_at.isnot(None),
+        RefreshToken.used_at < now - detection,
+    )
+
+
+def purge():
+    """Delete every dead refresh token row and return how many were deleted."""
+    deleted = db.session.execute(db.delete(RefreshToken).where(_dead(datetime.utcnow()))).rowcount
+    db.session.commit()
+    return deleted
+
+
+def issue_refresh_token(user_id, family_id=None):
+    """Store a new refresh token for ``user_id`` and return it.
+
+    The caller commits. Without ``family_id`` the token starts a new family.
+    The user's dead tokens are deleted in the same transaction.
+    """
+    db.session.execute(
+        db.delete(RefreshToken).where(RefreshToken.user_id == int(user_id), _dead(datetime.utcnow()))
+    )
+    token = secrets.token_urlsafe(32)
+    db.session.add(RefreshToken(
+        token_hash=_hash(token),
+        family_id=family_id or uuid.uuid4().hex,
+        user_id=int(user_id),
+        expires_at=datetime.utcnow() + timedelta(seconds=current_app.config['REFRESH_TOKEN_EXPIRES'])
+    ))
+    return token
+
+
+def rotate_refresh_token(token):
+    """Exchange a refresh token for the next one in its family.
+
+    Returns (user_id, new token). Raises InvalidRefreshToken if the token
+    can't be used, revoking its family first if it had already been used
+    outside the grace period.
+    """
+    now = datetime.utcnow()
+    stored = _find(token) if isinstance(token, str) else None
+    if stored is None or stored.revoked_at is not None or stored.expires_at <= now:
+        raise InvalidRefreshToken()
+
+    # Conditional update so only one refresh claims the first use
+    claimed = db.session.execute(
+        db.update(RefreshToken)
+        .where(RefreshToken.id == stored.id, RefreshToken.used_at.is_(None))
+        .values(used_at=now)
+    ).rowcount
+    # A concurrent refresh that just claimed it is within the grace period
+    used_at = stored.used_at or now
+    grace = timedelta(seconds=current_app.config['REFRESH_TOKEN_REUSE_GRACE'])
+    if not claimed and now - used_at > grace:
+        _revoke_family(stored.family_id, now)
+        db.session.commit()
+        current_app.logger.warning('Refresh token reused; revoked family %s of user %s',
+                                   stored.family_id, stored.user_id)
+        raise InvalidRefreshToken()
+
+    new_token = issue_refresh_token(stored.user_id, stored.family_id)
+    db.session.commit()
+    return stored.user_id, new_token
+
+
+def revoke_refresh_token(token):
+    """Revoke the family of ``token``, e.g. on logout. Unknown tokens are ignored."""
+    stored = _find(token) if isinstance(token, str) else None
+    if stored is not None:
+        _revoke_family(stored.family_id, datetime.utcnow())
+        db.session.commit()
@@ -0,0 +1,188 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from flask import current_app
+
+from achievements import record_games
+from cache import stats_cache
+from models import GameStats
+from sharding import shards
+
+# Placed on the queue to wake the flusher when draining
+_STOP = object()
+
+# Records that could not be written, one JSON object per line, so they can
+# be replayed once the cause is fixed
+dead_letters = logging.getLogger('write_behind.dead_letter')
+
+
+class WriteBehindQueue:
+    """Buffer validated game stats and group-commit them from a background thread.
+
+    Enabled with GAME_STATS_WRITE_BEHIND. Records are flushed every
+    WRITE_BEHIND_FLUSH_MS milliseconds or once WRITE_BEHIND_BATCH_SIZE are
+    waiting, whichever comes first, with one commit per shard per batch.
+    Records still queued when the process exits are lost unless ``drain``
+    runs first, so it is registered with atexit and gunicorn's worker_exit.
+    If a batch fails its records are retried one by one, and only those
+    that still fail are dropped, to the ``write_behind.dead_letter`` log.
+    """
+
+    def __init__(self, app=None):
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GAME_STATS_WRITE_BEHIND', False)
+        app.config.setdefault('WRITE_BEHIND_FLUSH_MS', 200)
+        app.config.setdefault('WRITE_BEHIND_BATCH_SIZE', 500)
+        app.config.setdefault('WRITE_BEHIND_MAX_QUEUE', 10000)
+        app.extensions['write_behind'] = self
+
+    @property
+    def enabled(self):
+        return current_app.config['GAME_STATS_WRITE_BEHIND']
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, fields):
+        """Queue the fields of a GameStats row and return its provisional id.
+
+        Returns None if the queue is full; the caller should then write the
+        row synchronously.
+        """
+        app = current_app._get_current_object()
+        self._start(app)
+
+        provisional_id = uuid.uuid4().hex
+        try:
+            self._queue.put_nowait((app, fields))
+        except queue.Full:
+            return None
+        return provisional_id
+
+    def _start(self, app):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=app.config['WRITE_BEHIND_MAX_QUEUE'])
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(app.config['WRITE_BEHIND_FLUSH_MS'] / 1000, app.config['WRITE_BEHIND_BATCH_SIZE']),
+                name='game-stats-write-behind',
+                daemon=True
+            )
+            self._thread.start()
+
+    def _run(self, interval, batch_size):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            # Collect until the batch is full or the interval has passed
+            batch = [item]
+            deadline = time.monotonic() + interval
+            stopping = False
+            while len(batch) < batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self.flush(batch)
+            if stopping:
+                return
+
+    def flush(self, batch):
+        """Write a batch of queued records with one commit per app and shard."""
+        by_app = defaultdict(list)
+        for app, fields in batch:
+            by_app[app].append(fields)
+
+        for app, records in by_app.items():
+            with app.app_context():
+                by_shard = defaultdict(list)
+                for fields in records:
+                    by_shard[shards.shard_for(fields['user_id'])].append(fields)
+
+                for records_on_shard in by_shard.values():
+                    self._commit(records_on_shard)
+
+    def _commit(self, records):
+        session = shards.session_for(records[0]['user_id'])
+        try:
+            self._write(session, records)
+        except Exception:
+            session.rollback()
+            if len(records) == 1:
+                self._dead_letter(records[0])
+                return
+            # Every record was already accepted, so retry them one by one
+            # and drop only those that fail on their own
+            current_app.logger.warning('Write-behind flush of %d game stats failed, retrying one by one',
+                                       len(records))
+            written = []
+            for fields in records:
+                try:
+                    self._write(session, [fields])
+                except Exception:
+                    session.rollback()
+                    self._dead_letter(fields)
+                else:
+                    written.append(fields)
+            records = written
+        for user_id in {fields['user_id'] for fields in records}:
+            stats_cache.invalidate_user(user_id)
+
+    def _write(self, session, records):
+        games = [GameStats(**fields) for fields in records]
+        session.add_all(games)
+        record_games(session, games)
+        session.commit()
+
+    def _dead_letter(self, fields):
+        current_app.logger.exception('Write-behind dropped game stats of user %s', fields['user_id'])
+        dead_letters.error(json.dumps(fields, default=str))
+
+    def drain(self):
+        """Stop the flusher and write everything still queued."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            remaining = self._queue
+            remaining.put(_STOP)
+        thread.join()
+
+        batch = []
+        while True:
+            try:
+                item = remaining.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        if batch:
+            self.flush(batch)
+
+
+write_behind = WriteBehindQueue()
+atexit.register(write_behind.drain)
@@ -1,6 +1,10 @@
+from analytics import analytics
 from app import create_app
 
 app = create_app()
 
+# Each worker keeps its own analytics snapshot up to date
+analytics.start(app)
+
 if __name__ == "__main__":
     app.run()
\ No newline at end of file
@@ -44,6 +44,28 @@ const getToken = () => localStorage.getItem('token');
 const setToken = (token) => localStorage.setItem('token', token);
 const removeToken = () => localStorage.removeItem('token');
 
+const getRefreshToken = () => localStorage.getItem('refreshToken');
+const setRefreshToken = (token) => localStorage.setItem('refreshToken', token);
+const removeRefreshToken = () => localStorage.removeItem('refreshToken');
+
+const storeTokens = (data) => {
+  setToken(data.access_token);
+  if (data.refresh_token) {
+    setRefreshToken(data.refresh_token);
+  }
+};
+
+// Refresh tokens are single use, so concurrent callers share one request
+let refreshPromise = null;
+
+// Tabs share the stored tokens, so they also take turns refreshing them
+const withRefreshLock = (refresh) => {
+  if (typeof navigator !== 'undefined' && navigator.locks) {
+    return navigator.locks.request('minesweeper-token-refresh', refresh);
+  }
+  return refresh();
+};
+
 const getHeaders = () => {
   const headers = {
     'Content-Type': 'application/json',
@@ -57,6 +79,19 @@ const getHeaders = () => {
   return headers;
 };
 
+// Headers for authenticated calls, refreshing an expired access token first
+const getAuthHeaders = async () => {
+  if (isTokenExpired(getToken()) && getRefreshToken()) {
+    try {
+      await authAPI.refreshToken();
+    } catch (refreshError) {
+      authAPI.logout();
+      throw new Error('Session expired. Please log in again.');
+    }
+  }
+  return getHeaders();
+};
+
 export const authAPI = {
   register: async (userData) => {
     const response = await fetch(`${API_URL}/register`, {
@@ -68,7 +103,7 @@ export const authAPI = {
     });
     
     const data = await handleResponse(response);
-    setToken(data.access_token);
+    storeTokens(data);
     return data;
   },
   
@@ -82,37 +117,68 @@ export const authAPI = {
     });
     
     const data = await handleResponse(response);
-    setToken(data.access_token);
+    storeTokens(data);
     return data;
   },
   
   logout: () => {
+    const refreshToken = getRefreshToken();
+    if (refreshToken) {
+      // Revoke the session server side; local tokens are dropped regardless
+      fetch(`${API_URL}/logout`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch((e) => console.error('Logout request failed', e));
+    }
     removeToken();
+    removeRefreshToken();
   },
   
   getCurrentUser: async () => {
     const response = await fetch(`${API_URL}/user`, {
-      headers: getHeaders(),
+      headers: await getAuthHeaders(),
     });
     
     return handleResponse(response);
   },
   
   refreshToken: async () => {
-    const response = await fetch(`${API_URL}/refresh`, {
-      method: 'POST',
-      headers: getHeaders(),
-    });
-    
-    const data = await handleResponse(response);
-    setToken(data.access_token);
-    return data;
+    if (!refreshPromise) {
+      const presented = getRefreshToken();
+      refreshPromise = withRefreshLock(async () => {
+        // Another tab may have refreshed while this one waited for the lock
+        if (getRefreshToken() !== presented && !isTokenExpired(getToken())) {
+          return { access_token: getToken(), refresh_token: getRefreshToken() };
+        }
+        
+        const response = await fetch(`${API_URL}/refresh`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ refresh_token: getRefreshToken() }),
+        });
+        
+        const data = await handleResponse(response);
+        storeTokens(data);
+        return data;
+      }).finally(() => {
+        refreshPromise = null;
+      });
+    }
+    return refreshPromise;
   },
   
   isAuthenticated: () => {
     const token = getToken();
     if (!token) return false;
     
+    // An expired access token is fine while there is a refresh token
+    if (getRefreshToken()) return true;
+    
     try {
       const parts = token.split('.');
       return parts.length === 3 && !isTokenExpired(token);
@@ -127,7 +193,7 @@ export const gameStatsAPI = {
   saveGameStats: async (gameData) => {
     const response = await fetch(`${API_URL}/game-stats`, {
       method: 'POST',
-      headers: getHeaders(),
+      headers: await getAuthHeaders(),
       body: JSON.stringify(gameData),
     });
     
@@ -136,7 +202,7 @@ export const gameStatsAPI = {
   
   getUserGameStats: async () => {
     const response = await fetch(`${API_URL}/user/game-stats`, {
-      headers: getHeaders(),
+      headers: await getAuthHeaders(),
     });
     
     return handleResponse(response);
@@ -144,7 +210,7 @@ export const gameStatsAPI = {
   
   getStatsSummary: async () => {
     const response = await fetch(`${API_URL}/user/game-stats/summary`, {
-      headers: getHeaders(),
+      headers: await getAuthHeaders(),
     });
     
     return handleResponse(response);